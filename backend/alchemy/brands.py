@@ -0,0 +1,95 @@
+"""
+Brand and model extraction for products.
+
+Brand comes from Flipkart's productBrand field when the product JSON has one, else
+from the longest known brand at the start of the title, else from the first title
+word. The model is the rest of the title without the variant part in parentheses,
+e.g. "SAMSUNG Galaxy S23 (Green, 128 GB)" -> ("Samsung", "Galaxy S23").
+
+Brands are stored in their canonical spelling from BRAND_NAMES, so lookups and
+facets compare plain indexed values.
+
+usage:
+- python -m backend.alchemy.brands  # fill brand/model for products stored without them
+"""
+
+import re
+from typing import Optional, Tuple
+
+# Canonical spellings; aliases and other casings map onto them through BRAND_ALIASES
+BRAND_NAMES = [
+    'Acer', 'Alcatel', 'Apple', 'Asus', 'boAt', 'CMF by Nothing', 'Dell', 'Google', 'HP', 'Honor',
+    'Huawei', 'Infinix', 'iQOO', 'itel', 'JBL', 'Lava', 'Lenovo', 'LG', 'Micromax', 'Motorola',
+    'MSI', 'Noise', 'Nokia', 'Nothing', 'OnePlus', 'OPPO', 'POCO', 'realme', 'REDMI', 'Samsung',
+    'Sony', 'Tecno', 'vivo', 'Xiaomi',
+]
+
+BRAND_ALIASES = {name.lower(): name for name in BRAND_NAMES}
+BRAND_ALIASES.update({
+    'mi': 'Xiaomi',
+    'moto': 'Motorola',
+    'one plus': 'OnePlus',
+})
+
+# Title prefixes are tried longest first, so "CMF by Nothing" wins over "Nothing"
+_MAX_ALIAS_WORDS = max(len(alias.split()) for alias in BRAND_ALIASES)
+# The trailing "(colour, storage)" group; parentheses inside the model name stay
+_VARIANT = re.compile(r'\s*\([^)]*\)\s*$')
+
+
+def normalize_brand(brand: Optional[str]) -> Optional[str]:
+    """Canonical spelling of a brand name; unknown brands keep their own spelling"""
+    if not brand or not brand.strip():
+        return None
+    brand = ' '.join(brand.split())
+    return BRAND_ALIASES.get(brand.lower(), brand)
+
+
+def extract_brand_model(title: Optional[str], product_brand: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """(brand, model) of a product from its title and, when present, Flipkart's productBrand"""
+    words = _VARIANT.sub('', title or '').split()
+    brand, brand_words = None, 0
+    for size in range(min(_MAX_ALIAS_WORDS, len(words)), 0, -1):
+        alias = ' '.join(words[:size]).lower()
+        if alias in BRAND_ALIASES:
+            brand, brand_words = BRAND_ALIASES[alias], size
+            break
+
+    if product_brand:
+        brand = normalize_brand(product_brand)
+        # Only strip the title's leading words when they are that brand
+        leading = ' '.join(words[:len(product_brand.split())]).lower()
+        brand_words = len(product_brand.split()) if normalize_brand(leading) == brand else 0
+    elif brand is None and words:
+        brand, brand_words = words[0], 1
+
+    model = ' '.join(words[brand_words:]) or None
+    return brand[:64] if brand else None, model[:128] if model else None
+
+
+def backfill(mysql, batch_size: int = 1000) -> int:
+    """Fill brand and model of every live and archived product that has no brand yet"""
+    from backend.alchemy.models import Products, ArchivedProduct
+
+    filled = 0
+    for table in (Products, ArchivedProduct):
+        last_id = 0
+        while True:
+            rows = mysql.get_products_without_brand(last_id, batch_size, table)
+            if not rows:
+                break
+            mysql.set_brands([(id, *extract_brand_model(title)) for id, title in rows], table)
+            last_id = rows[-1][0]
+            filled += len(rows)
+            print(f"Filled brand for {filled} products")
+    return filled
+
+
+if __name__ == '__main__':
+    from backend.alchemy.database import MysqlConnection
+
+    db = MysqlConnection()
+    try:
+        print(f"Filled brand and model for {backfill(db)} products")
+    finally:
+        db.close_all()
@@ -1,15 +1,114 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, update, func
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import text
 
-from backend.alchemy.models import Base, User
+from backend.alchemy import brands
+from backend.alchemy.database import MysqlConnection
+from backend.alchemy.models import Base, User, Products
+from backend.alchemy.records import get_price_point
+from backend.alchemy.ranking import get_scores
 from backend.settings.config import get_database_url, AUTH_CONFIG
 from backend.utils.auth import get_password_hash
 
+def upgrade_tables(engine):
+    """Add columns and indexes introduced after a table was first created"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    print(f"Added column {table.name}.{column.name}")
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    print(f"Added index {index.name} on {table.name}")
+
+def backfill_product_columns(engine, batch_size: int = 5000):
+    """Fill the price, rating_average, last_seen, leaderboard score and brand/model columns of rows stored before they existed"""
+    SessionLocal = sessionmaker(bind=engine)
+    last_id, filled = 0, 0
+    with SessionLocal() as db:
+        while True:
+            rows = db.query(Products.id, Products.pricing, Products.rating, Products.time_update).filter(
+                Products.id > last_id,
+                Products.price.is_(None),
+                Products.rating_average.is_(None)
+            ).order_by(Products.id).limit(batch_size).all()
+            if not rows:
+                break
+            updates = []
+            for id, pricing, rating, time_update in rows:
+                rating = rating if isinstance(rating, dict) else {}
+                updates.append({
+                    'id': id,
+                    'price': get_price_point({'pricing': pricing})['price'],
+                    'rating_average': rating.get('average'),
+                    'time_update': time_update,  # not a content change
+                })
+            db.bulk_update_mappings(Products, updates)
+            db.commit()
+            last_id = rows[-1][0]
+            filled += len(rows)
+    if filled:
+        print(f"Backfilled price and rating columns for {filled} products")
+
+    # Rows stored before last_seen existed count as last seen when they last changed
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(Products).where(Products.last_seen.is_(None)).values(
+                last_seen=func.date(Products.time_update), time_update=Products.time_update
+            )
+        )
+    if result.rowcount:
+        print(f"Backfilled last_seen for {result.rowcount} products")
+
+    # Without scores the /trending and /discounted leaderboards stay empty until a rescore
+    last_id, scored = 0, 0
+    with SessionLocal() as db:
+        while True:
+            rows = db.query(Products.id, Products.rating, Products.pricing, Products.time_update).filter(
+                Products.id > last_id,
+                Products.trending_score.is_(None),
+                Products.discount.is_(None)
+            ).order_by(Products.id).limit(batch_size).all()
+            if not rows:
+                break
+            updates = []
+            for id, rating, pricing, time_update in rows:
+                trending_score, discount = get_scores(rating, pricing)
+                if trending_score is not None or discount is not None:
+                    updates.append({'id': id, 'trending_score': trending_score, 'discount': discount, 'time_update': time_update})
+            db.bulk_update_mappings(Products, updates)
+            db.commit()
+            last_id = rows[-1][0]
+            scored += len(updates)
+    if scored:
+        print(f"Backfilled trending and discount scores for {scored} products")
+
+    # Without a brand, products are missing from brand filters and facets; set_brands keeps time_update
+    mysql = MysqlConnection(engine.url.render_as_string(hide_password=False), replica_urls=[])
+    try:
+        filled = brands.backfill(mysql, batch_size)
+    finally:
+        mysql.close_all()
+    if filled:
+        print(f"Backfilled brand and model for {filled} products")
+
 def create_tables():
     """Create tables for database and seed admin user"""
     try:
         engine = create_engine(get_database_url())
         Base.metadata.create_all(engine)
+        upgrade_tables(engine)
+        backfill_product_columns(engine)
         print("Tables created successfully!")
 
         # Seed Admin User
@@ -1,88 +1,211 @@
 import json
+import time
+import threading
+from datetime import date, datetime, timedelta
 
-from sqlalchemy import create_engine, func, cast, Float
+from sqlalchemy import (
+    event, create_engine, func, cast, case, Float, and_, or_,
+    Table, MetaData, Column, Integer, Text, Date, DateTime, insert, update, delete, select, bindparam
+)
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.sql import text
 
-from backend.alchemy.models import Products
-from backend.settings.config import DB_URL
+from backend.alchemy.models import (
+    Products, ArchivedProduct, PriceHistory, PriceDaily, ScrapeJob, ScrapeSchedule, ScheduleRun, ProductSignature, ProductBand
+)
+from backend.alchemy.records import ProductRecord
+from backend.alchemy.brands import normalize_brand
+from backend.alchemy.history import get_bucket
+from backend.alchemy.similarity import get_band_keys, rank_candidates
+from backend.alchemy.replicas import get_replica_set
+from backend.settings.config import DB_URL, REPLICA_CONFIG
+
+# Write-side view of the products table used on ingest. Every column is plain text so the
+# JSON that ProductRecord already encoded is sent as-is instead of being decoded and re-encoded.
+INGEST_TABLE = Table(
+    Products.__tablename__, MetaData(),
+    Column('id', Integer, primary_key=True),
+    *[Column(column, Text) for column in ProductRecord.COLUMNS],
+    Column('time_update', DateTime),
+    Column('variant_group', Integer),
+    Column('last_seen', Date),
+)
+PRODUCT_COLUMNS = [column.name for column in Products.__table__.columns]
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(url: str = DB_URL):
+    """The process-wide engine (and connection pool) for `url`, created on first use"""
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _engines[url] = create_engine(url, pool_pre_ping=True)
+        return engine
 
 class MysqlConnection:
-    def __init__(self):
-        self.engine = create_engine(DB_URL, pool_pre_ping=True)
-        session_factory = sessionmaker(bind=self.engine)
-        self.session = scoped_session(session_factory)
+    def __init__(self, url: str = DB_URL, replica_urls: list = None):
+        # Nothing connects until the first query, so importing a module that holds one is cheap
+        self.url = url
+        # Replicas are configured for the primary in DB_URL; any other database is read directly
+        self.replica_urls = (REPLICA_CONFIG['urls'] if url == DB_URL else []) if replica_urls is None else replica_urls
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._pending_write = False  # the primary session holds uncommitted writes
+        self._written_at = None  # time.monotonic() of the last committed write
+
+    @property
+    def engine(self):
+        return get_engine(self.url)
+
+    @property
+    def session(self) -> scoped_session:
+        """Primary session, for writes and for reads that must see them"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    factory = sessionmaker(bind=self.engine)
+                    event.listen(factory, 'do_orm_execute', self._on_execute)
+                    event.listen(factory, 'after_flush', self._on_write)
+                    event.listen(factory, 'after_commit', self._on_commit)
+                    event.listen(factory, 'after_rollback', self._on_rollback)
+                    self._session = scoped_session(factory)
+        return self._session
+
+    @property
+    def replica_set(self):
+        return get_replica_set(self.replica_urls, get_engine)
+
+    @property
+    def read_session(self) -> scoped_session:
+        """Session for read-only catalogue queries: a usable replica, else the primary"""
+        recently_written = self._written_at is not None and \
+            time.monotonic() - self._written_at < REPLICA_CONFIG['read_after_write_seconds']
+        if not self.replica_urls or self._pending_write or recently_written:
+            return self.session
+        replica = self.replica_set.pick()
+        return replica.session if replica is not None else self.session
+
+    def _on_execute(self, orm_execute_state):
+        if not orm_execute_state.is_select:
+            self._pending_write = True
+
+    def _on_write(self, *args):
+        self._pending_write = True
+
+    def _on_commit(self, session):
+        if self._pending_write:
+            self._pending_write = False
+            self._written_at = time.monotonic()
+
+    def _on_rollback(self, session):
+        self._pending_write = False
 
-    def get_products(self, page: int = 1, limit: int = 20):
+    def collapse_variants(self, query):
+        """Keep one product (the lowest id) per variant group among the rows `query` matches"""
+        representatives = query.with_entities(func.min(Products.id)).group_by(
+            func.coalesce(Products.variant_group, Products.id)
+        )
+        return query.session.query(Products).filter(Products.id.in_(representatives.scalar_subquery()))
+
+    def get_products(self, page: int = 1, limit: int = 20, collapse_variants: bool = False):
         offset = (page - 1) * limit
-        total = self.session.query(Products).count()
-        products = self.session.query(Products).offset(offset).limit(limit).all()
+        query = self.read_session.query(Products)
+        if collapse_variants:
+            query = self.collapse_variants(query)
+        total = query.count()
+        products = query.offset(offset).limit(limit).all()
         return products, total
     
     def get_products_by_category(self, category: str):
-        return self.session.query(Products).filter(Products.category == category).all()
+        return self.read_session.query(Products).filter(Products.category == category).all()
     
     def get_products_by_brand(self, brand: str):
-        return self.session.query(Products).filter(Products.title.contains(brand)).all()
+        return self.read_session.query(Products).filter(Products.brand == normalize_brand(brand)).order_by(Products.id).all()
+    
+    def get_product(self, id: int, include_archived: bool = False):
+        session = self.read_session
+        product = session.query(Products).filter(Products.id == id).first()
+        if product is None and include_archived:
+            product = session.query(ArchivedProduct).filter(ArchivedProduct.id == id).first()
+        return product
     
-    def get_product(self, id: int):
-        return self.session.query(Products).filter(Products.id == id).first()
+    def get_products_by_keys(self, keys: list, key: str = 'id', table=Products):
+        """Products whose `key` column ('id' or 'product_id') is in `keys`, in one IN query"""
+        column = table.id if key == 'id' else table.product_id
+        return self.read_session.query(table).filter(column.in_(keys)).all()
     
-    def search_products(self, query: str, page: int = 1, limit: int = 20):
-        """Search products by title, category, and specifications"""
+    def search_products(self, query: str, page: int = 1, limit: int = 20, collapse_variants: bool = False,
+                        include_archived: bool = False):
+        """Search products by title, category, and specifications; archived matches follow the live ones"""
         # Convert query to lowercase for case-insensitive search
         search_term = f"%{query.lower()}%"
         
         offset = (page - 1) * limit
+        session = self.read_session
         
-        base_query = self.session.query(Products).filter(
+        base_query = session.query(Products).filter(
             Products.title.ilike(search_term) |
             Products.category.ilike(search_term) |
             Products.specifications.ilike(search_term)
         )
+        if collapse_variants:
+            base_query = self.collapse_variants(base_query)
         
         total = base_query.count()
         products = base_query.offset(offset).limit(limit).all()
+        if include_archived:
+            archived_query = session.query(ArchivedProduct).filter(
+                ArchivedProduct.title.ilike(search_term) |
+                ArchivedProduct.category.ilike(search_term) |
+                ArchivedProduct.specifications.ilike(search_term)
+            )
+            if len(products) < limit:
+                products += archived_query.order_by(ArchivedProduct.id).offset(
+                    max(0, offset - total)
+                ).limit(limit - len(products)).all()
+            total += archived_query.count()
         
         return products, total
     
     def get_products_by_price_range(self, min_price: float, max_price: float):
         """Filter products by price range"""
         # Extract current price from pricing JSON (non-strikeOff price)
-        return self.session.query(Products).filter(
+        return self.read_session.query(Products).filter(
             text("JSON_EXTRACT(pricing, '$.prices[*].value') BETWEEN :min_price AND :max_price")
             .params(min_price=min_price, max_price=max_price)
         ).all()
     
     def get_products_by_rating(self, min_rating: float):
         """Filter products by minimum rating"""
-        return self.session.query(Products).filter(
+        return self.read_session.query(Products).filter(
             text("JSON_EXTRACT(rating, '$.average') >= :min_rating")
             .params(min_rating=min_rating)
         ).all()
     
     def get_products_by_availability(self, status: str):
         """Filter products by availability status"""
-        return self.session.query(Products).filter(Products.availability == status).all()
+        return self.read_session.query(Products).filter(Products.availability == status).all()
     
     def get_product_statistics(self):
         """Get comprehensive product statistics"""
-        total_products = self.session.query(Products).count()
+        session = self.read_session
+        total_products = session.query(Products).count()
         
         # Category breakdown
-        category_stats = self.session.query(
+        category_stats = session.query(
             Products.category,
             func.count(Products.id).label('count')
         ).group_by(Products.category).all()
         
         # Availability breakdown
-        availability_stats = self.session.query(
+        availability_stats = session.query(
             Products.availability,
             func.count(Products.id).label('count')
         ).group_by(Products.availability).all()
         
         # Average rating calculation - properly reference the table
-        avg_rating_result = self.session.query(
+        avg_rating_result = session.query(
             func.avg(func.json_extract(Products.rating, '$.average')).label('avg_rating')
         ).scalar()
         
@@ -93,31 +216,450 @@ class MysqlConnection:
             'avgRating': float(avg_rating_result) if avg_rating_result else 0.0
         }
     
-    def get_trending_products(self, limit: int = 10):
-        """Get trending products based on rating and review count"""
-        # Calculate trending score: (rating * 0.7) + (normalized_reviews * 0.3) * 5
-        return self.session.query(Products).filter(
-            text("JSON_EXTRACT(rating, '$.average') > 0")
-        ).order_by(
-            text("""
-                (JSON_EXTRACT(rating, '$.average') * 0.7 + 
-                 LEAST(JSON_EXTRACT(rating, '$.reviewCount') / 1000.0, 1) * 0.3 * 5) DESC
-            """)
-        ).limit(limit).all()
-    
-    def get_discounted_products(self):
-        """Get products with active discounts"""
-        return self.session.query(Products).filter(
-            text("JSON_EXTRACT(pricing, '$.totalDiscount') > 0")
-        ).order_by(
-            text("JSON_EXTRACT(pricing, '$.totalDiscount') DESC")
-        ).all()
+    def filter_products(self, query, q: str = None, category: str = None, availability: str = None,
+                        min_price: float = None, max_price: float = None, min_rating: float = None,
+                        brand: str = None):
+        """Apply the search/browse context shared by the facet and listing queries"""
+        if q:
+            search_term = f"%{q.lower()}%"
+            query = query.filter(
+                Products.title.ilike(search_term) |
+                Products.category.ilike(search_term) |
+                Products.specifications.ilike(search_term)
+            )
+        if category:
+            query = query.filter(Products.category == category)
+        if brand:
+            query = query.filter(Products.brand == normalize_brand(brand))
+        if availability:
+            query = query.filter(Products.availability == availability)
+        if min_price is not None:
+            query = query.filter(Products.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Products.price <= max_price)
+        if min_rating is not None:
+            query = query.filter(Products.rating_average >= min_rating)
+        return query
+    
+    def get_facets(self, price_buckets: list, **filters):
+        """Category, availability, price-bucket and rating-bucket counts from one grouped query, brand counts from a second"""
+        price_bucket = case(
+            (Products.price.is_(None), None),
+            *[(Products.price < edge, index) for index, edge in enumerate(price_buckets)],
+            else_=len(price_buckets)
+        )
+        rating_bucket = func.floor(Products.rating_average)  # CAST AS INTEGER rounds on MySQL
+        session = self.read_session
+        query = self.filter_products(session.query(
+            Products.category, Products.availability, price_bucket, rating_bucket, func.count(Products.id)
+        ), **filters).group_by(Products.category, Products.availability, price_bucket, rating_bucket)
+
+        total = 0
+        categories, availability, prices, ratings = {}, {}, [0] * (len(price_buckets) + 1), {}
+        for category, status, price_index, rating, count in query.all():
+            total += count
+            categories[category] = categories.get(category, 0) + count
+            availability[status] = availability.get(status, 0) + count
+            if price_index is not None:
+                prices[price_index] += count
+            if rating is not None:
+                ratings[int(rating)] = ratings.get(int(rating), 0) + count
+
+        # Brands have too many values to join the grouping above; ix_products_brand serves this one
+        brands = dict(self.filter_products(
+            session.query(Products.brand, func.count(Products.id)), **filters
+        ).filter(Products.brand.isnot(None)).group_by(Products.brand).order_by(func.count(Products.id).desc()).all())
+        edges = [0] + list(price_buckets) + [None]
+        return {
+            'total': total,
+            'categories': categories,
+            'availability': availability,
+            'price': [
+                {'min': edges[index], 'max': edges[index + 1], 'count': count}
+                for index, count in enumerate(prices)
+            ],
+            'rating': {str(rating): ratings[rating] for rating in sorted(ratings, reverse=True)},
+            'brands': brands,
+        }
+    
+    def get_trending_products(self, limit: int = 10, category: str = None):
+        """Top products by the precomputed trending score, read off ix_products_(category_)trending"""
+        query = self.read_session.query(Products).filter(Products.trending_score.isnot(None))
+        if category:
+            query = query.filter(Products.category == category)
+        return query.order_by(Products.trending_score.desc(), Products.id.desc()).limit(limit).all()
+    
+    def get_discounted_products(self, limit: int = 100, category: str = None):
+        """Products with the largest discounts, read off ix_products_(category_)discount"""
+        query = self.read_session.query(Products).filter(Products.discount > 0)
+        if category:
+            query = query.filter(Products.category == category)
+        return query.order_by(Products.discount.desc(), Products.id.desc()).limit(limit).all()
     
     def insert(self, data: dict, table=Products):
         product = table(**data)
         self.session.add(product)
         self.session.commit()
     
+    def bulk_insert(self, rows: list, table=Products, commit: bool = True):
+        """Insert many rows in one round trip without building ORM objects"""
+        if rows:
+            self._pending_write = True
+            self.session.bulk_insert_mappings(table, rows)
+        if commit:
+            self.session.commit()
+    
+    def bulk_update(self, rows: list, table=Products, commit: bool = True):
+        """Update many rows keyed by primary key in one round trip"""
+        if rows:
+            self._pending_write = True
+            self.session.bulk_update_mappings(table, rows)
+        if commit:
+            self.session.commit()
+    
+    def insert_records(self, records: list, commit: bool = True):
+        """Insert ProductRecords with a single executemany, bypassing the ORM"""
+        if records:
+            statement = insert(INGEST_TABLE).values(time_update=func.current_timestamp(), last_seen=func.current_date())
+            self.session.execute(statement, [record.to_row() for record in records])
+        if commit:
+            self.session.commit()
+    
+    def update_records(self, updates: list, commit: bool = True):
+        """Rewrite stored rows from (id, ProductRecord) pairs with a single executemany"""
+        if updates:
+            statement = update(INGEST_TABLE).where(INGEST_TABLE.c.id == bindparam('b_id')).values(
+                time_update=func.current_timestamp(),
+                last_seen=func.current_date(),
+                **{column: bindparam('b_%s' % column) for column in ProductRecord.COLUMNS}
+            )
+            self.session.execute(statement, [
+                {'b_%s' % column: value for column, value in record.to_row(id).items()}
+                for id, record in updates
+            ])
+        if commit:
+            self.session.commit()
+    
+    def get_content_hashes(self, product_ids: list, table=Products) -> dict:
+        """Map product_id -> (id, content_hash) for the given products that already exist"""
+        if not product_ids:
+            return {}
+        rows = self.session.query(table.product_id, table.id, table.content_hash).filter(
+            table.product_id.in_(product_ids)
+        ).all()
+        return {product_id: (id, content_hash) for product_id, id, content_hash in rows}
+    
+    def mark_seen(self, ids: list, commit: bool = True):
+        """Set last_seen to today for unchanged products a scrape listed again"""
+        if ids:
+            # Through INGEST_TABLE, which has no onupdate, so time_update still means "last changed"
+            today = func.current_date()
+            last_seen = INGEST_TABLE.c.last_seen
+            self.session.execute(update(INGEST_TABLE).where(
+                INGEST_TABLE.c.id.in_(ids), or_(last_seen.is_(None), last_seen < today)
+            ).values(last_seen=today))
+        if commit:
+            self.session.commit()
+    
+    def get_stale_product_ids(self, before: date, limit: int = 1000) -> list:
+        """Ids of products last seen before `before`, oldest first"""
+        return [id for id, in self.session.query(Products.id).filter(
+            Products.last_seen < before
+        ).order_by(Products.last_seen, Products.id).limit(limit).all()]
+    
+    def archive_products(self, ids: list, commit: bool = True):
+        """Move products to products_archive, keeping their ids"""
+        if ids:
+            self.session.execute(insert(ArchivedProduct).from_select(
+                PRODUCT_COLUMNS + ['archived_at'],
+                select(*[Products.__table__.c[column] for column in PRODUCT_COLUMNS], func.current_timestamp()).where(
+                    Products.id.in_(ids)
+                )
+            ))
+            self.session.execute(delete(Products).where(Products.id.in_(ids)).execution_options(synchronize_session=False))
+        if commit:
+            self.session.commit()
+    
+    def restore_products(self, product_ids: list, commit: bool = True) -> int:
+        """Move archived products listed again back into products under their old ids"""
+        if not product_ids:
+            return 0
+        ids = [id for id, in self.session.query(ArchivedProduct.id).filter(ArchivedProduct.product_id.in_(product_ids)).all()]
+        if ids:
+            self.session.execute(insert(Products).from_select(
+                PRODUCT_COLUMNS,
+                select(*[ArchivedProduct.__table__.c[column] for column in PRODUCT_COLUMNS]).where(ArchivedProduct.id.in_(ids))
+            ))
+            self.session.execute(delete(ArchivedProduct).where(ArchivedProduct.id.in_(ids)).execution_options(synchronize_session=False))
+        if commit:
+            self.session.commit()
+        return len(ids)
+    
+    def get_products_without_brand(self, after_id: int, limit: int = 1000, table=Products):
+        """(id, title) of products with no brand and an id above `after_id`, in id order"""
+        return self.session.query(table.id, table.title).filter(
+            table.id > after_id, table.brand.is_(None)
+        ).order_by(table.id).limit(limit).all()
+    
+    def set_brands(self, rows: list, table=Products, commit: bool = True):
+        """Set brand and model from (id, brand, model) tuples with a single executemany"""
+        if rows:
+            columns = table.__table__.c
+            # time_update is set to itself so its onupdate does not fire
+            statement = update(table.__table__).where(columns.id == bindparam('b_id')).values(
+                brand=bindparam('b_brand'), model=bindparam('b_model'), time_update=columns.time_update
+            )
+            self.session.execute(statement, [{'b_id': id, 'b_brand': brand, 'b_model': model} for id, brand, model in rows])
+        if commit:
+            self.session.commit()
+    
+    def get_ranking_inputs(self, after_id: int, limit: int = 1000, table=Products):
+        """(id, rating, pricing) of products with an id above `after_id`, in id order"""
+        return self.session.query(table.id, table.rating, table.pricing).filter(
+            table.id > after_id
+        ).order_by(table.id).limit(limit).all()
+    
+    def set_scores(self, rows: list, table=Products, commit: bool = True):
+        """Set trending_score and discount from (id, trending_score, discount) tuples with a single executemany"""
+        if rows:
+            columns = table.__table__.c
+            statement = update(table.__table__).where(columns.id == bindparam('b_id')).values(
+                trending_score=bindparam('b_trending_score'), discount=bindparam('b_discount'),
+                time_update=columns.time_update
+            )
+            self.session.execute(statement, [
+                {'b_id': id, 'b_trending_score': score, 'b_discount': discount} for id, score, discount in rows
+            ])
+        if commit:
+            self.session.commit()
+    
+    def get_similarity_candidates(self, band_keys: set) -> dict:
+        """Indexed products sharing any of the band keys: {'bands': {key: [id]}, 'signatures': {id: (signature, group)}}"""
+        bands, signatures = {}, {}
+        keys = list(band_keys)
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start:start + 1000]
+            rows = self.session.query(ProductBand.band, ProductBand.product_id).filter(ProductBand.band.in_(chunk)).all()
+            for band, id in rows:
+                bands.setdefault(band, []).append(id)
+            # Selected by the same band keys, so the round trips do not grow with the number of candidates
+            members = self.session.query(ProductBand.product_id).filter(ProductBand.band.in_(chunk))
+            rows = self.session.query(ProductSignature.product_id, ProductSignature.signature, Products.variant_group).join(
+                Products, Products.id == ProductSignature.product_id
+            ).filter(ProductSignature.product_id.in_(members.scalar_subquery())).all()
+            signatures.update({id: (signature, group) for id, signature, group in rows})
+        # Bands can outlive a deleted product; drop members without a signature
+        return {
+            'bands': {key: [id for id in members if id in signatures] for key, members in bands.items()},
+            'signatures': signatures,
+        }
+    
+    def save_signatures(self, signatures: list, bands: list, commit: bool = True):
+        self.bulk_insert(signatures, table=ProductSignature, commit=False)
+        self.bulk_insert(bands, table=ProductBand, commit=commit)
+    
+    def set_variant_groups(self, groups: list, commit: bool = True):
+        """Assign variant groups from (id, variant_group) pairs with a single executemany"""
+        if groups:
+            statement = update(INGEST_TABLE).where(INGEST_TABLE.c.id == bindparam('b_id')).values(
+                variant_group=bindparam('b_variant_group')
+            )
+            self.session.execute(statement, [{'b_id': id, 'b_variant_group': group} for id, group in groups])
+        if commit:
+            self.session.commit()
+    
+    def get_unindexed_products(self, limit: int = 1000):
+        """(id, title, specifications) of products without a similarity signature, oldest first"""
+        return self.session.query(Products.id, Products.title, Products.specifications).outerjoin(
+            ProductSignature, ProductSignature.product_id == Products.id
+        ).filter(ProductSignature.product_id.is_(None)).order_by(Products.id).limit(limit).all()
+    
+    def get_similar_products(self, id: int, limit: int = 10, min_similarity: float = 0.5):
+        """[(similarity, product)] for the product's LSH candidates, most similar first; None if it is not indexed"""
+        signature = self.session.query(ProductSignature.signature).filter(ProductSignature.product_id == id).scalar()
+        if signature is None:
+            return None
+        if not signature:
+            return []
+        candidates = self.get_similarity_candidates(set(get_band_keys(signature)))['signatures']
+        candidates.pop(id, None)
+        ranked = rank_candidates(signature, candidates, min_similarity)[:limit]
+        products = {
+            product.id: product for product in
+            self.session.query(Products).filter(Products.id.in_([match[1] for match in ranked])).all()
+        }
+        return [(similarity, products[match_id]) for similarity, match_id, _ in ranked if match_id in products]
+    
+    def record_price_history(self, rows: list, commit: bool = True):
+        """Append price history points"""
+        self.bulk_insert(rows, table=PriceHistory, commit=commit)
+    
+    def get_price_history(self, id: int, start: date, end: date):
+        """Daily min/max/close rollups for a product within [start, end]"""
+        return self.read_session.query(PriceDaily).filter(
+            PriceDaily.product_id == id,
+            PriceDaily.day >= start,
+            PriceDaily.day <= end
+        ).order_by(PriceDaily.day).all()
+    
+    def get_raw_price_history(self, id: int, start: datetime, end: datetime):
+        """Raw price points for a product within [start, end), only kept for the retention window"""
+        return self.read_session.query(PriceHistory).filter(
+            PriceHistory.product_id == id,
+            PriceHistory.recorded_at >= start,
+            PriceHistory.recorded_at < end
+        ).order_by(PriceHistory.recorded_at).all()
+    
+    def get_last_rollup_day(self):
+        return self.session.query(func.max(PriceDaily.day)).scalar()
+    
+    def get_first_price_history_time(self):
+        # Both lookups are served by ix_history_bucket_time (bucket, recorded_at)
+        bucket = self.session.query(func.min(PriceHistory.bucket)).scalar()
+        if bucket is None:
+            return None
+        return self.session.query(func.min(PriceHistory.recorded_at)).filter(PriceHistory.bucket == bucket).scalar()
+    
+    def rollup_price_history_day(self, day: date):
+        """Downsample one day of raw points into price_daily min/max/close rows"""
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        # The bucket equality lets ix_history_bucket_time serve the range instead of a full scan
+        in_day = and_(
+            PriceHistory.bucket == get_bucket(start),
+            PriceHistory.recorded_at >= start,
+            PriceHistory.recorded_at < end
+        )
+
+        daily = self.session.query(
+            PriceHistory.product_id,
+            func.min(PriceHistory.price).label('min_price'),
+            func.max(PriceHistory.price).label('max_price'),
+            func.max(PriceHistory.recorded_at).label('last_seen')
+        ).filter(in_day).group_by(PriceHistory.product_id).subquery()
+
+        closes = self.session.query(
+            PriceHistory.product_id, daily.c.min_price, daily.c.max_price,
+            PriceHistory.price, PriceHistory.mrp, PriceHistory.discount, PriceHistory.availability
+        ).join(daily, and_(
+            PriceHistory.product_id == daily.c.product_id,
+            PriceHistory.recorded_at == daily.c.last_seen
+        )).filter(in_day).all()
+
+        rows = {}
+        for product_id, min_price, max_price, price, mrp, discount, availability in closes:
+            rows[product_id] = {
+                'product_id': product_id,
+                'day': day,
+                'min_price': min_price,
+                'max_price': max_price,
+                'close_price': price,
+                'close_mrp': mrp,
+                'close_discount': discount,
+                'close_availability': availability,
+            }
+
+        self.session.query(PriceDaily).filter(PriceDaily.day == day).delete(synchronize_session=False)
+        self.bulk_insert(list(rows.values()), table=PriceDaily)
+    
+    def expire_price_history(self, before_bucket: int):
+        """
+        Delete raw points in monthly buckets older than `before_bucket`. This is a bulk
+        DELETE over ix_history_bucket_time, not a partition drop: price_history is not
+        partitioned.
+        """
+        deleted = self.session.query(PriceHistory).filter(
+            PriceHistory.bucket < before_bucket
+        ).delete(synchronize_session=False)
+        self.session.commit()
+        return deleted
+    
+    def create_job(self, job: dict):
+        self.session.add(ScrapeJob(**job))
+        self.session.commit()
+    
+    def get_job(self, job_id: str):
+        return self.session.query(ScrapeJob).filter(ScrapeJob.id == job_id).first()
+    
+    def get_resumable_jobs(self, stale_before: datetime, limit: int = 50):
+        """Jobs that stopped before their last page, most recent first. A running job only
+        counts once it has not checkpointed since `stale_before`, i.e. its worker died."""
+        return self.session.query(ScrapeJob).filter(
+            ScrapeJob.status != 'completed',
+            ScrapeJob.last_page < ScrapeJob.max_pages,
+            or_(ScrapeJob.status != 'running', ScrapeJob.updated_at < stale_before)
+        ).order_by(ScrapeJob.updated_at.desc()).limit(limit).all()
+    
+    def get_running_jobs(self, limit: int = 50, stale_before: datetime = None):
+        """Running jobs, most recent first; with `stale_before`, only those that checkpointed since then"""
+        query = self.session.query(ScrapeJob).filter(ScrapeJob.status == 'running')
+        if stale_before is not None:
+            query = query.filter(ScrapeJob.updated_at >= stale_before)
+        return query.order_by(ScrapeJob.updated_at.desc()).limit(limit).all()
+    
+    def save_checkpoint(self, job_id: str, page: int, stats: dict, commit: bool = True):
+        """Advance a job's checkpoint; pass commit=False to commit it together with the page's rows"""
+        self.session.query(ScrapeJob).filter(ScrapeJob.id == job_id).update(
+            {ScrapeJob.last_page: page, ScrapeJob.stats: dict(stats), ScrapeJob.status: 'running'},
+            synchronize_session=False
+        )
+        if commit:
+            self.session.commit()
+    
+    def finish_job(self, job_id: str, status: str, stats: dict):
+        self.session.query(ScrapeJob).filter(ScrapeJob.id == job_id).update(
+            {ScrapeJob.status: status, ScrapeJob.stats: dict(stats)},
+            synchronize_session=False
+        )
+        self.session.commit()
+    
+    def get_due_schedules(self, now: datetime, limit: int = 50):
+        """Enabled schedules whose next run is due, oldest first"""
+        return self.session.query(ScrapeSchedule).filter(
+            ScrapeSchedule.enabled == 1,
+            ScrapeSchedule.next_run_at <= now
+        ).order_by(ScrapeSchedule.next_run_at).limit(limit).all()
+    
+    def claim_schedule(self, schedule_id: int, scheduled_for: datetime, next_run_at: datetime) -> bool:
+        """Advance next_run_at only if nobody else did, so one worker fires each run"""
+        claimed = self.session.query(ScrapeSchedule).filter(
+            ScrapeSchedule.id == schedule_id,
+            ScrapeSchedule.next_run_at == scheduled_for
+        ).update({ScrapeSchedule.next_run_at: next_run_at}, synchronize_session=False)
+        self.session.commit()
+        return claimed == 1
+    
+    def update_schedule(self, schedule_id: int, values: dict):
+        self.session.query(ScrapeSchedule).filter(ScrapeSchedule.id == schedule_id).update(
+            {getattr(ScrapeSchedule, key): value for key, value in values.items()},
+            synchronize_session=False
+        )
+        self.session.commit()
+    
+    def get_schedule(self, schedule_id: int):
+        return self.session.query(ScrapeSchedule).filter(ScrapeSchedule.id == schedule_id).first()
+    
+    def is_job_running(self, job_id: str, stale_before: datetime) -> bool:
+        """A job counts as running until it finishes or stops checkpointing for too long"""
+        return self.session.query(ScrapeJob.id).filter(
+            ScrapeJob.id == job_id,
+            ScrapeJob.status == 'running',
+            ScrapeJob.updated_at >= stale_before
+        ).first() is not None
+    
+    def start_schedule_run(self, run: dict) -> int:
+        schedule_run = ScheduleRun(**run)
+        self.session.add(schedule_run)
+        self.session.commit()
+        return schedule_run.id
+    
+    def finish_schedule_run(self, run_id: int, status: str, finished_at: datetime, duration_seconds: float):
+        self.session.query(ScheduleRun).filter(ScheduleRun.id == run_id).update(
+            {ScheduleRun.status: status, ScheduleRun.finished_at: finished_at, ScheduleRun.duration_seconds: duration_seconds},
+            synchronize_session=False
+        )
+        self.session.commit()
+    
     def exists(self, product_id: str, table=Products):
         return self.session.query(table).filter(table.product_id == product_id).first() is not None
     
@@ -126,6 +668,8 @@ class MysqlConnection:
 
     def close_all(self):
         self.session.close()
+        if self.replica_urls:
+            self.replica_set.close_all()
 
 if __name__ == '__main__':
     db = MysqlConnection()
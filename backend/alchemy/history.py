@@ -0,0 +1,79 @@
+"""
+Price/availability history helpers and the daily rollup job.
+
+Raw points live in price_history (one compact row per observed change, bucketed by
+month) and are downsampled into price_daily min/max/close rows. Raw buckets older
+than HISTORY_CONFIG['raw_retention_days'] are deleted once they are rolled up. The table
+is not partitioned: expiry is a bulk DELETE by bucket, served by ix_history_bucket_time.
+
+usage:
+- python -m backend.alchemy.history  # roll up every finished day and expire old raw points
+"""
+
+from datetime import datetime, date, timedelta
+from typing import Optional
+
+from backend.settings.config import HISTORY_CONFIG
+from backend.alchemy.records import AVAILABILITY_CODES
+
+AVAILABILITY_NAMES = {code: name for name, code in AVAILABILITY_CODES.items()}
+
+
+def get_bucket(moment: datetime) -> int:
+    """Monthly bucket (YYYYMM) a point recorded at `moment` belongs to"""
+    return moment.year * 100 + moment.month
+
+
+def build_history_rows(records: list, ids: dict, recorded_at: Optional[datetime] = None) -> list:
+    """History rows for product records whose DB id is known, keyed by product_id in `ids`"""
+    recorded_at = recorded_at or datetime.utcnow()
+    bucket = get_bucket(recorded_at)
+    rows = []
+    for record in records:
+        id = ids.get(record.product_id)
+        if id is None:
+            continue
+        rows.append({
+            'product_id': id,
+            'bucket': bucket,
+            'recorded_at': recorded_at,
+            'price': record.price,
+            'mrp': record.mrp,
+            'discount': record.discount,
+            'availability': record.availability_code,
+        })
+    return rows
+
+
+def rollup(mysql, until: Optional[date] = None) -> int:
+    """Roll up every finished day before `until` (default today) and expire old raw points"""
+    until = until or datetime.utcnow().date()
+    last_day = mysql.get_last_rollup_day()
+    if last_day is None:
+        first_point = mysql.get_first_price_history_time()
+        if first_point is None:
+            return 0
+        day = first_point.date()
+    else:
+        day = last_day + timedelta(days=1)
+
+    days = 0
+    while day < until:
+        mysql.rollup_price_history_day(day)
+        day += timedelta(days=1)
+        days += 1
+
+    # Only whole months older than the retention window are dropped, and only once rolled up
+    cutoff = datetime.combine(min(until, day), datetime.min.time()) - timedelta(days=HISTORY_CONFIG['raw_retention_days'])
+    mysql.expire_price_history(get_bucket(cutoff))
+    return days
+
+
+if __name__ == '__main__':
+    from backend.alchemy.database import MysqlConnection
+
+    db = MysqlConnection()
+    try:
+        print(f"Rolled up {rollup(db)} days of price history")
+    finally:
+        db.close_all()
@@ -1,6 +1,8 @@
+from datetime import datetime
+
 from sqlalchemy import (
     Column, Integer, String, DateTime,
-    func, Index, Float
+    func, Index, Float, BigInteger, SmallInteger, Date, LargeBinary
 )
 from sqlalchemy.dialects.mysql import JSON
 from sqlalchemy.ext.declarative import declarative_base
@@ -8,12 +10,13 @@ from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
 
 
-class Products(Base):
-    __tablename__ = 'products'
-
+class ProductColumns:
+    """Columns shared by the live products table and its archive"""
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     product_id = Column(String(128), unique=True)
     title = Column(String(128))
+    brand = Column(String(64))  # canonical brand, see backend.alchemy.brands
+    model = Column(String(128))  # title without the brand and the variant part
     url = Column(String(128))
     rating = Column(JSON)
     specifications = Column(JSON)
@@ -23,11 +26,153 @@ class Products(Base):
     warrantySummary = Column(String(128))
     availability = Column(String(128))
     source = Column(String(32), nullable=False, index=True)
+    content_hash = Column(String(40))  # sha1 of the volatile fields (pricing, availability, rating)
+    variant_group = Column(Integer, index=True)  # id of the first product of its near-duplicate group
+    price = Column(Integer)  # current selling price, copied out of pricing for filtering and facets
+    rating_average = Column(Float)  # copied out of rating
+    discount = Column(SmallInteger)  # pricing.totalDiscount, ranks /discounted
+    trending_score = Column(Float)  # see backend.alchemy.ranking; NULL for unrated products
+    last_seen = Column(Date)  # last day a scrape listed the product, changed or not
     time_update = Column(DateTime, default=func.current_timestamp(), onupdate=func.current_timestamp(), nullable=False)
 
+
+class Products(ProductColumns, Base):
+    __tablename__ = 'products'
+
     __table_args__ = (
         Index('idx_source', 'source', 'id'),
         Index('ix_time', 'time_update'),
+        Index('ix_products_category_price', 'category', 'price'),
+        Index('ix_products_rating', 'rating_average'),
+        Index('ix_products_last_seen', 'last_seen'),
+        Index('ix_products_brand', 'brand', 'id'),
+        # Leaderboards: top K overall or per category is a K-row index range scan
+        Index('ix_products_trending', 'trending_score'),
+        Index('ix_products_category_trending', 'category', 'trending_score'),
+        Index('ix_products_discount', 'discount'),
+        Index('ix_products_category_discount', 'category', 'discount'),
+    )
+
+
+class ArchivedProduct(ProductColumns, Base):
+    """Products not seen for RETENTION_CONFIG['archive_after_days'], see backend.alchemy.retention"""
+    __tablename__ = 'products_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # keeps its products.id
+    archived_at = Column(DateTime, nullable=False)
+
+    __table_args__ = {'mysql_row_format': 'COMPRESSED'}
+
+
+class ProductSignature(Base):
+    """MinHash signature of a product's title and specs, see backend.alchemy.similarity"""
+    __tablename__ = 'product_signatures'
+
+    product_id = Column(Integer, primary_key=True, autoincrement=False)  # products.id
+    signature = Column(LargeBinary(1024), nullable=False)  # packed uint32 values, empty if nothing to hash
+
+
+class ProductBand(Base):
+    """LSH band keys; products sharing a key are near-duplicate candidates"""
+    __tablename__ = 'product_lsh'
+
+    band = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=False)
+    product_id = Column(Integer, primary_key=True, autoincrement=False)  # products.id
+
+
+class PriceHistory(Base):
+    """Append-only price/availability points, one per observed change"""
+    __tablename__ = 'price_history'
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    product_id = Column(Integer, nullable=False)  # products.id
+    bucket = Column(Integer, nullable=False)  # YYYYMM of recorded_at, used to expire raw points by month
+    recorded_at = Column(DateTime, nullable=False)
+    price = Column(Integer)
+    mrp = Column(Integer)
+    discount = Column(SmallInteger)
+    availability = Column(SmallInteger)  # see backend.alchemy.history.AVAILABILITY_CODES
+
+    __table_args__ = (
+        Index('ix_history_product_time', 'product_id', 'recorded_at'),
+        Index('ix_history_bucket_time', 'bucket', 'recorded_at'),
+    )
+
+
+class PriceDaily(Base):
+    """Daily min/max/close rollup of price_history"""
+    __tablename__ = 'price_daily'
+
+    product_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+    min_price = Column(Integer)
+    max_price = Column(Integer)
+    close_price = Column(Integer)
+    close_mrp = Column(Integer)
+    close_discount = Column(SmallInteger)
+    close_availability = Column(SmallInteger)
+
+
+class ScrapeJob(Base):
+    """Durable checkpoint of a scrape job, advanced in the same transaction as each page's products"""
+    __tablename__ = 'scrape_jobs'
+
+    id = Column(String(32), primary_key=True)
+    query = Column(String(255), nullable=False)
+    engine = Column(String(16), nullable=False, default='html')
+    max_pages = Column(Integer, nullable=False)
+    refresh = Column(Integer, default=0)
+    params_hash = Column(String(40), nullable=False)
+    last_page = Column(Integer, nullable=False, default=0)  # last page whose products are committed
+    stats = Column(JSON)
+    status = Column(String(16), nullable=False, default='running', index=True)  # running, completed, cancelled, error
+    # UTC from the app, like the stale-job cutoffs compared against updated_at; MySQL's
+    # CURRENT_TIMESTAMP is in the server's time zone
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ScrapeSchedule(Base):
+    """A recurring scrape, fired by the scheduler from a cron expression or a fixed interval"""
+    __tablename__ = 'scrape_schedules'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(100), unique=True, nullable=False)
+    query = Column(String(255), nullable=False)
+    max_pages = Column(Integer, nullable=False, default=1)
+    engine = Column(String(16), nullable=False, default='html')
+    refresh = Column(Integer, default=1)
+    cron = Column(String(100))  # either cron or interval_seconds is set
+    interval_seconds = Column(Integer)
+    jitter_seconds = Column(Integer, default=0)
+    overlap_policy = Column(String(8), nullable=False, default='skip')  # skip, merge
+    enabled = Column(Integer, default=1)
+    next_run_at = Column(DateTime)
+    last_run_at = Column(DateTime)
+    pending_run = Column(Integer, default=0)  # merge policy: one coalesced run owed once the current one ends
+    running_job_id = Column(String(32))
+    created_at = Column(DateTime, default=func.current_timestamp())
+
+    __table_args__ = (
+        Index('ix_schedule_due', 'enabled', 'next_run_at'),
+    )
+
+
+class ScheduleRun(Base):
+    """History of scheduler firings, including skipped and merged ones"""
+    __tablename__ = 'schedule_runs'
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    schedule_id = Column(Integer, nullable=False)
+    job_id = Column(String(32))
+    status = Column(String(16), nullable=False)  # running, completed, cancelled, error, skipped, merged
+    scheduled_for = Column(DateTime)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime)
+    duration_seconds = Column(Float)
+
+    __table_args__ = (
+        Index('ix_schedule_runs_schedule', 'schedule_id', 'started_at'),
     )
 
 
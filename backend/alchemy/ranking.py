@@ -0,0 +1,66 @@
+"""
+Trending and discount scores for the product leaderboards.
+
+Scores are computed when a product is written (ProductRecord) and stored in
+products.trending_score and products.discount. The indexes on (score) and
+(category, score) keep every leaderboard, overall and per category, sorted as rows
+are written. Reading the top K is then a K-row index range scan instead of
+scoring and sorting the whole table on every call.
+
+The trending formula is configured in RANKING_CONFIG.
+
+usage:
+- python -m backend.alchemy.ranking  # recompute stored scores, e.g. after changing the formula
+"""
+
+from typing import Optional
+
+from backend.settings.config import RANKING_CONFIG
+
+
+def get_trending_score(rating_average: Optional[float], review_count: Optional[int], config: dict = RANKING_CONFIG) -> Optional[float]:
+    """Trending score of a product, or None for unrated products, which never trend"""
+    if not rating_average or rating_average <= 0:
+        return None
+    reviews = min((review_count or 0) / config['trending_reviews_cap'], 1)
+    return round(rating_average * config['trending_rating_weight'] + reviews * 5 * config['trending_reviews_weight'], 4)
+
+
+def get_scores(rating, pricing) -> tuple:
+    """(trending_score, discount) of a stored product from its rating and pricing JSON"""
+    from backend.alchemy.records import get_price_point
+
+    rating = rating if isinstance(rating, dict) else {}
+    return (
+        get_trending_score(rating.get('average'), rating.get('reviewCount')),
+        get_price_point({'pricing': pricing})['discount'],
+    )
+
+
+def rescore(mysql, batch_size: int = 1000) -> int:
+    """Recompute trending_score and discount of every live and archived product"""
+    from backend.alchemy.models import Products, ArchivedProduct
+
+    scored = 0
+    for table in (Products, ArchivedProduct):
+        last_id = 0
+        while True:
+            rows = mysql.get_ranking_inputs(last_id, batch_size, table)
+            if not rows:
+                break
+            scores = [(id, *get_scores(rating, pricing)) for id, rating, pricing in rows]
+            mysql.set_scores(scores, table)
+            last_id = rows[-1][0]
+            scored += len(rows)
+            print(f"Scored {scored} products")
+    return scored
+
+
+if __name__ == '__main__':
+    from backend.alchemy.database import MysqlConnection
+
+    db = MysqlConnection()
+    try:
+        print(f"Rescored {rescore(db)} products")
+    finally:
+        db.close_all()
@@ -0,0 +1,184 @@
+"""
+Compact product records for the ingest hot path.
+
+A ProductRecord is a slotted object holding a product's scalar fields, its nested
+rating/specifications/media/pricing structures pre-encoded as JSON text, and typed
+price and rating numbers. Records are what the parse workers return and what the
+bulk writers in MysqlConnection insert. No ORM objects are built on ingest.
+"""
+
+import json
+import hashlib
+from typing import Optional
+from urllib.parse import urljoin
+
+from backend.alchemy.brands import extract_brand_model
+from backend.alchemy.ranking import get_trending_score
+from backend.alchemy.similarity import get_shingles, get_signature
+
+# Keep in sync with the hash assembled in ProductRecord.from_product
+VOLATILE_FIELDS: tuple = ('pricing', 'availability', 'rating')
+
+AVAILABILITY_CODES = {
+    'IN_STOCK': 1,
+    'OUT_OF_STOCK': 2,
+    'COMING_SOON': 3,
+    'TEMPORARILY_UNAVAILABLE': 4,
+    'PERMANENTLY_DISCONTINUED': 5,
+}
+
+
+def encode_json(value) -> str:
+    # sort_keys keeps the encoding stable so content hashes only change with the data
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+
+
+def get_content_hash(product_details: dict, fields: tuple = VOLATILE_FIELDS) -> str:
+    """Hash the fields that change between scrapes so unchanged rows can be skipped."""
+    volatile = {field: product_details.get(field) for field in fields}
+    return hashlib.sha1(encode_json(volatile).encode('utf-8')).hexdigest()
+
+
+def get_price_point(product_details: dict) -> dict:
+    """Extract current price, MRP, discount and availability code from product details"""
+    pricing = product_details.get('pricing')
+    if not isinstance(pricing, dict):
+        pricing = {}
+
+    price = mrp = None
+    for entry in pricing.get('prices') or []:
+        value = entry.get('value')
+        if value is None:
+            continue
+        if entry.get('strikeOff'):
+            mrp = int(value) if mrp is None else mrp
+        elif price is None:
+            price = int(value)
+
+    discount = pricing.get('totalDiscount')
+    return {
+        'price': price,
+        'mrp': mrp if mrp is not None else price,
+        'discount': int(discount) if discount is not None else None,
+        'availability': AVAILABILITY_CODES.get(product_details.get('availability'), 0),
+    }
+
+
+class ProductRecord:
+    """One scraped product, ready to be written without building an ORM object"""
+
+    __slots__ = (
+        'product_id', 'title', 'brand', 'model', 'url', 'category', 'warrantySummary', 'availability', 'source',
+        'rating', 'specifications', 'media', 'pricing', 'content_hash',
+        'price', 'mrp', 'discount', 'availability_code',
+        'rating_average', 'rating_count', 'review_count', 'trending_score', 'minhash',
+    )
+
+    # Columns written to the products table, in order
+    COLUMNS: tuple = (
+        'product_id', 'title', 'url', 'rating', 'specifications', 'media', 'pricing',
+        'category', 'warrantySummary', 'availability', 'source', 'content_hash',
+        'price', 'rating_average', 'brand', 'model', 'discount', 'trending_score',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_product(cls, product: dict, base_url: str) -> 'ProductRecord':
+        """Validate a Flipkart productInfo value and build its record, raising ValueError if malformed"""
+        try:
+            product_id = product['id']
+            title = product['titles']['title']
+            url = urljoin(base_url, product['baseUrl'])
+            category = product['vertical']
+            media = [img['url'] for img in product['media']['images']]
+        except (KeyError, TypeError) as e:
+            raise ValueError('Malformed product %s: missing %s' % (product.get('id', '?'), e))
+        if not isinstance(product_id, str) or not isinstance(title, str):
+            raise ValueError('Malformed product %s: id and title must be strings' % product_id)
+
+        details = {
+            'rating': product.get('rating', 'No rating available'),
+            'pricing': product.get('pricing', 'No pricing information available'),
+            'availability': (product.get('availability') or {}).get('displayState', 'No availability information available'),
+        }
+        rating = details['rating'] if isinstance(details['rating'], dict) else {}
+        point = get_price_point(details)
+        rating_json = encode_json(details['rating'])
+        pricing_json = encode_json(details['pricing'])
+        # Same bytes get_content_hash would hash, assembled from the already-encoded fields
+        volatile_json = '{"availability":%s,"pricing":%s,"rating":%s}' % (
+            encode_json(details['availability']), pricing_json, rating_json
+        )
+
+        specifications = product.get('keySpecs', 'No specifications available')
+        brand, model = extract_brand_model(title, product.get('productBrand'))
+        return cls(
+            product_id=product_id,
+            title=title,
+            brand=brand,
+            model=model,
+            url=url,
+            category=category,
+            warrantySummary=product.get('warrantySummary', 'No warranty information available'),
+            availability=details['availability'],
+            source='flipkart',
+            rating=rating_json,
+            specifications=encode_json(specifications),
+            media=encode_json(media),
+            pricing=pricing_json,
+            content_hash=hashlib.sha1(volatile_json.encode('utf-8')).hexdigest(),
+            price=point['price'],
+            mrp=point['mrp'],
+            discount=point['discount'],
+            availability_code=point['availability'],
+            rating_average=rating.get('average'),
+            rating_count=rating.get('count'),
+            review_count=rating.get('reviewCount'),
+            trending_score=get_trending_score(rating.get('average'), rating.get('reviewCount')),
+            minhash=get_signature(get_shingles(title, specifications)),
+        )
+
+    @classmethod
+    def from_details(cls, product_details: dict) -> 'ProductRecord':
+        """Build a record from a product details dict as returned by get_product_details"""
+        point = get_price_point(product_details)
+        rating = product_details.get('rating')
+        rating = rating if isinstance(rating, dict) else {}
+        fields = dict(product_details)
+        for column in ('rating', 'specifications', 'media', 'pricing'):
+            fields[column] = encode_json(product_details.get(column))
+        fields.setdefault('content_hash', get_content_hash(product_details))
+        if not fields.get('brand'):
+            fields['brand'], fields['model'] = extract_brand_model(product_details.get('title'))
+        fields.update(
+            price=point['price'],
+            mrp=point['mrp'],
+            discount=point['discount'],
+            availability_code=point['availability'],
+            rating_average=rating.get('average'),
+            rating_count=rating.get('count'),
+            review_count=rating.get('reviewCount'),
+            trending_score=get_trending_score(rating.get('average'), rating.get('reviewCount')),
+            minhash=get_signature(get_shingles(product_details.get('title'), product_details.get('specifications'))),
+        )
+        return cls(**fields)
+
+    def to_row(self, id: Optional[int] = None) -> dict:
+        """Column values for a bulk insert/update; JSON columns stay pre-encoded"""
+        row = {column: getattr(self, column) for column in self.COLUMNS}
+        if id is not None:
+            row['id'] = id
+        return row
+
+    def to_dict(self) -> dict:
+        """The product details dict, with the JSON columns decoded"""
+        details = self.to_row()
+        for column in ('rating', 'specifications', 'media', 'pricing'):
+            details[column] = json.loads(details[column])
+        return details
+
+    def __repr__(self):
+        return 'ProductRecord(%r, %r)' % (self.product_id, self.title)
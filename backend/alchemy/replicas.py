@@ -0,0 +1,193 @@
+"""
+Read replicas for the product query layer.
+
+MysqlConnection sends its read-only catalogue queries (listing, search, filters,
+facets, statistics, leaderboards, price history) to a replica from
+REPLICA_CONFIG['urls'], round-robin. Writes, and every read on the ingest path,
+stay on the primary.
+
+A background worker checks each replica every health_check_seconds: it must answer
+a query and, on MySQL, report a replication lag (SHOW REPLICA STATUS) within
+max_lag_seconds. A replica that fails either check gets no reads until it passes
+again. With no usable replica, reads go to the primary. A connection that has just
+written reads from the primary for read_after_write_seconds, so it sees its own
+writes.
+
+Replica sessions run in autocommit, so every query sees the replica's latest data
+instead of a snapshot held open by the thread's session.
+
+To try it locally, point DATABASE_URL at one instance and DATABASE_REPLICA_URLS at
+another, e.g. two SQLite files or two MySQL servers with replication between them.
+"""
+
+import itertools
+import threading
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.sql import text
+
+from backend.utils.logger import get_logger
+from backend.settings.config import REPLICA_CONFIG
+
+# (statement, lag column) for MySQL 8.0.22+ and for older servers
+_LAG_QUERIES = (
+    ('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+    ('SHOW SLAVE STATUS', 'Seconds_Behind_Master'),
+)
+
+
+def _refresh_loaded_rows(orm_execute_state):
+    # A replica session lives as long as its thread; reloading rows it already holds
+    # keeps those objects from going stale between requests
+    if orm_execute_state.is_select:
+        orm_execute_state.update_execution_options(populate_existing=True)
+
+
+class Replica:
+    """One read replica, its autocommit session and the result of its last health check."""
+
+    def __init__(self, url: str, engine):
+        self.url = url
+        self.engine = engine.execution_options(isolation_level='AUTOCOMMIT')
+        factory = sessionmaker(bind=self.engine, autoflush=False)
+        event.listen(factory, 'do_orm_execute', _refresh_loaded_rows)
+        self.session = scoped_session(factory)
+        self.healthy = False
+        self.lag: Optional[float] = None  # seconds behind the primary; None if replication is stopped
+        self.error: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.engine.url.render_as_string(hide_password=True)
+
+    def is_usable(self, max_lag_seconds: float) -> bool:
+        return self.healthy and self.lag is not None and self.lag <= max_lag_seconds
+
+    def to_dict(self, max_lag_seconds: float) -> dict:
+        return {
+            'replica': self.name,
+            'usable': self.is_usable(max_lag_seconds),
+            'healthy': self.healthy,
+            'lag_seconds': self.lag,
+            'error': self.error,
+        }
+
+
+class ReplicaSet:
+    MODULE: str = 'REPLICAS'
+
+    def __init__(
+        self,
+        urls: List[str],
+        engine_factory: Callable,
+        health_check_seconds: float = REPLICA_CONFIG['health_check_seconds'],
+        max_lag_seconds: float = REPLICA_CONFIG['max_lag_seconds'],
+    ):
+        self.logger = get_logger(self.MODULE)
+        self.replicas = [Replica(url, engine_factory(url)) for url in urls]
+        self.health_check_seconds = health_check_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self._cursor = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self):
+        """Run the first health check and start the background worker, once."""
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is not None:
+                return
+            # Checked on the caller's thread, so the first reads are already routed
+            self.check()
+            self._worker = threading.Thread(target=self._run, name='replica-health-check', daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def pick(self) -> Optional[Replica]:
+        """The next usable replica round-robin, or None when reads should go to the primary."""
+        self.start()
+        usable = [replica for replica in self.replicas if replica.is_usable(self.max_lag_seconds)]
+        if not usable:
+            return None
+        return usable[next(self._cursor) % len(usable)]
+
+    def check(self):
+        for replica in self.replicas:
+            was_usable, last_error = replica.is_usable(self.max_lag_seconds), replica.error
+            try:
+                with replica.engine.connect() as connection:
+                    connection.execute(text('SELECT 1'))
+                    lag, error = self.get_lag(connection)
+            except Exception as e:
+                replica.healthy, replica.lag, replica.error = False, None, str(e).splitlines()[0]
+            else:
+                replica.healthy, replica.lag, replica.error = True, lag, error
+                if error and error != last_error:
+                    self.logger.error('Replica %s: %s' % (replica.name, error))
+
+            if replica.is_usable(self.max_lag_seconds) != was_usable:
+                if was_usable:
+                    self.logger.warning('Replica %s taken out of rotation (lag: %s, error: %s)' % (
+                        replica.name, replica.lag, replica.error
+                    ))
+                else:
+                    self.logger.info('Replica %s in rotation (lag: %s)' % (replica.name, replica.lag))
+
+    def get_lag(self, connection) -> tuple:
+        """
+        (seconds the replica is behind the primary, error). The lag is 0 for servers that
+        do not replicate and None when replication is stopped or the lag cannot be read.
+        """
+        if connection.dialect.name != 'mysql':
+            return 0.0, None
+        errors = []
+        for statement, column in _LAG_QUERIES:
+            try:
+                row = connection.execute(text(statement)).mappings().first()
+            except DBAPIError as e:
+                errors.append(str(e.orig or e).splitlines()[0])
+                continue
+            if row is None:
+                return 0.0, None
+            if row[column] is None:
+                return None, 'replication is stopped'
+            return float(row[column]), None
+        # E.g. no REPLICATION CLIENT privilege: an unknown lag must not pass as caught up
+        return None, 'cannot read the replication lag: %s' % '; '.join(errors)
+
+    def snapshot(self) -> List[dict]:
+        return [replica.to_dict(self.max_lag_seconds) for replica in self.replicas]
+
+    def close_all(self):
+        for replica in self.replicas:
+            replica.session.close()
+
+    def _run(self):
+        while not self._stopped.wait(self.health_check_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.error('Replica health check failed: %s' % str(e))
+
+
+_replica_sets = {}
+_replica_sets_lock = threading.Lock()
+
+
+def get_replica_set(urls: List[str], engine_factory: Callable) -> Optional[ReplicaSet]:
+    """The process-wide replica set for `urls`, created on first use; None without replicas."""
+    if not urls:
+        return None
+    key = tuple(urls)
+    with _replica_sets_lock:
+        replica_set = _replica_sets.get(key)
+        if replica_set is None:
+            replica_set = _replica_sets[key] = ReplicaSet(urls, engine_factory)
+        return replica_set
@@ -0,0 +1,48 @@
+"""
+Cold-data retention for the products table.
+
+Every scrape that lists a product sets its last_seen day, whether or not the product
+changed. Products not seen for RETENTION_CONFIG['archive_after_days'] are moved, in
+batches, to products_archive, a compressed table with the same columns. They keep
+their ids, so their price history and similarity index entries stay valid. This keeps
+the live table and its indexes down to the working set. A product listed again is
+moved back by the scraper before it is saved.
+
+Archived rows are only returned when a request asks for them (include_archived).
+
+usage:
+- python -m backend.alchemy.retention  # archive products not seen within the window
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from backend.settings.config import RETENTION_CONFIG
+
+
+def get_cutoff(today: Optional[date] = None, days: int = RETENTION_CONFIG['archive_after_days']) -> date:
+    """Products last seen before this day are archived"""
+    return (today or datetime.utcnow().date()) - timedelta(days=days)
+
+
+def archive(mysql, cutoff: Optional[date] = None, batch_size: int = RETENTION_CONFIG['batch_size']) -> int:
+    """Move every product last seen before `cutoff` to the archive, one committed batch at a time"""
+    cutoff = cutoff or get_cutoff()
+    archived = 0
+    while True:
+        ids = mysql.get_stale_product_ids(cutoff, batch_size)
+        if not ids:
+            return archived
+        mysql.archive_products(ids)
+        archived += len(ids)
+        print(f"Archived {archived} products")
+
+
+if __name__ == '__main__':
+    from backend.alchemy.database import MysqlConnection
+
+    db = MysqlConnection()
+    try:
+        print(f"Archived {archive(db)} products not seen since {get_cutoff()}")
+    finally:
+        db.close_all()
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
 
@@ -35,3 +35,60 @@ class User(UserBase):
 
     class Config:
         from_attributes = True
+
+class ScheduleBase(BaseModel):
+    name: str
+    query: str
+    max_pages: int = 1
+    engine: str = 'html'
+    refresh: bool = True
+    cron: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    jitter_seconds: Optional[int] = None  # None uses SCHEDULER_DEFAULT_JITTER_SECONDS
+    overlap_policy: str = 'skip'
+    enabled: bool = True
+
+class ScheduleCreate(ScheduleBase):
+    pass
+
+class ScheduleUpdate(BaseModel):
+    name: Optional[str] = None
+    query: Optional[str] = None
+    max_pages: Optional[int] = None
+    engine: Optional[str] = None
+    refresh: Optional[bool] = None
+    cron: Optional[str] = None
+    interval_seconds: Optional[int] = None
+    jitter_seconds: Optional[int] = None
+    overlap_policy: Optional[str] = None
+    enabled: Optional[bool] = None
+
+class Schedule(ScheduleBase):
+    id: int
+    next_run_at: Optional[datetime] = None
+    last_run_at: Optional[datetime] = None
+    pending_run: bool = False
+    running_job_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ScheduleRun(BaseModel):
+    id: int
+    schedule_id: int
+    job_id: Optional[str] = None
+    status: str
+    scheduled_for: Optional[datetime] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class ProductBatchRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    product_ids: Optional[List[str]] = None
+    fields: Optional[List[str]] = None  # None returns every column
+    include_archived: bool = False
@@ -0,0 +1,174 @@
+"""
+MinHash/LSH near-duplicate index for product variants.
+
+A product's title and key specs are reduced to word shingles, and those to a MinHash
+signature that estimates Jaccard similarity. The signature is cut into LSH bands,
+and each band is hashed to a key stored in product_lsh. Products that share any band
+key are candidate matches. Finding candidates is one indexed lookup per band, and
+only the candidates are compared, so the cost does not grow with the catalog.
+
+At ingest each new product joins the variant group of its most similar existing
+product above SIMILARITY_CONFIG['group_threshold'], or starts a new group.
+
+The functions up to build_group_updates are pure, so signatures can be computed in
+the parse workers.
+
+usage:
+- python -m backend.alchemy.similarity  # index products that have no signature yet
+"""
+
+import re
+import random
+import struct
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+from backend.settings.config import SIMILARITY_CONFIG
+
+NUM_PERM: int = SIMILARITY_CONFIG['num_perm']
+BANDS: int = SIMILARITY_CONFIG['bands']
+ROWS: int = NUM_PERM // BANDS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures stored in the database must stay comparable across restarts
+_rng = random.Random(1)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct('<%dI' % NUM_PERM)
+
+MODEL_NUMBER_WEIGHT: int = 3
+_TOKEN = re.compile(r'[a-z0-9.]+')
+_VARIANT = re.compile(r'\(([^)]*)\)')
+
+
+def get_shingles(title: str, specifications) -> set:
+    """Shingles that weigh the model name over variant details
+
+    Title words outside parentheses count as unigrams and bigrams, and words with
+    digits in them are added MODEL_NUMBER_WEIGHT more times. The variant part, e.g.
+    "(Green, 128 GB)", and the spec words only count as unigrams, so colour and
+    storage variants of one model stay close.
+    """
+    title = (title or '').lower()
+    words = _TOKEN.findall(_VARIANT.sub(' ', title))
+    shingles = set(words)
+    shingles.update('%s %s' % pair for pair in zip(words, words[1:]))
+    shingles.update('%s#%s' % (word, n) for word in words if any(c.isdigit() for c in word) for n in range(MODEL_NUMBER_WEIGHT))
+    for variant in _VARIANT.findall(title):
+        shingles.update(_TOKEN.findall(variant))
+    if isinstance(specifications, list):
+        for spec in specifications:
+            if isinstance(spec, str):
+                shingles.update('spec:%s' % word for word in _TOKEN.findall(spec.lower()))
+    return shingles
+
+
+def _hash_shingle(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def get_signature(shingles: Iterable[str]) -> Optional[bytes]:
+    """Packed MinHash signature of a shingle set, or None when there is nothing to hash"""
+    hashes = [_hash_shingle(shingle) for shingle in shingles]
+    if not hashes:
+        return None
+    return _SIGNATURE.pack(*[
+        min((a * value + b) % _PRIME for value in hashes) & _MAX_HASH
+        for a, b in _PERMUTATIONS
+    ])
+
+
+def unpack_signature(signature: bytes) -> tuple:
+    return _SIGNATURE.unpack(signature)
+
+
+def get_band_keys(signature: bytes) -> List[int]:
+    """One LSH key per band; a band's key mixes in its index so equal rows in different bands never collide"""
+    keys = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS * 4:(band + 1) * ROWS * 4]
+        digest = hashlib.blake2b(chunk, digest_size=7, person=b'band%04d' % band).digest()
+        keys.append(int.from_bytes(digest, 'little'))  # 56 bits, fits a signed BIGINT
+    return keys
+
+
+def estimate_similarity(first: bytes, second: bytes) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for a, b in zip(unpack_signature(first), unpack_signature(second)) if a == b) / NUM_PERM
+
+
+def rank_candidates(signature: bytes, candidates: Dict[int, tuple], min_similarity: float) -> List[tuple]:
+    """[(similarity, id, variant_group)] for candidates {id: (signature, variant_group)} above the threshold, best first"""
+    ranked = []
+    for id, (other, group) in candidates.items():
+        similarity = estimate_similarity(signature, other)
+        if similarity >= min_similarity:
+            ranked.append((similarity, id, group))
+    ranked.sort(key=lambda match: (-match[0], match[1]))
+    return ranked
+
+
+def build_group_updates(entries: list, mysql, threshold: float = SIMILARITY_CONFIG['group_threshold']) -> list:
+    """Index (id, signature) pairs and return their variant group assignments as (id, variant_group)
+
+    Each entry joins the group of its best match among already indexed products or
+    earlier entries of the same batch, else it starts its own group.
+    """
+    entries = [(id, signature) for id, signature in entries if signature]
+    if not entries:
+        return []
+    band_keys = {id: get_band_keys(signature) for id, signature in entries}
+    stored = mysql.get_similarity_candidates({key for keys in band_keys.values() for key in keys})
+
+    batch: Dict[int, tuple] = {}
+    batch_bands: Dict[int, set] = {}
+    groups = []
+    for id, signature in entries:
+        candidates = {}
+        for key in band_keys[id]:
+            for candidate in stored['bands'].get(key, ()):
+                if candidate != id:
+                    candidates[candidate] = stored['signatures'][candidate]
+            for candidate in batch_bands.get(key, ()):
+                candidates[candidate] = batch[candidate]
+        matches = rank_candidates(signature, candidates, threshold)
+        group = (matches[0][2] or matches[0][1]) if matches else id
+        batch[id] = (signature, group)
+        for key in band_keys[id]:
+            batch_bands.setdefault(key, set()).add(id)
+        groups.append((id, group))
+
+    mysql.save_signatures([
+        {'product_id': id, 'signature': signature} for id, signature in entries
+    ], [
+        {'band': key, 'product_id': id} for id, keys in band_keys.items() for key in keys
+    ], commit=False)
+    return groups
+
+
+def backfill(mysql, batch_size: int = 1000) -> int:
+    """Index every product that has no signature yet, oldest first"""
+    indexed = 0
+    while True:
+        rows = mysql.get_unindexed_products(batch_size)
+        if not rows:
+            return indexed
+        entries = [(id, get_signature(get_shingles(title, specifications))) for id, title, specifications in rows]
+        # Products with nothing to shingle still get an (empty) signature row so they are not picked again
+        mysql.save_signatures([
+            {'product_id': id, 'signature': b''} for id, signature in entries if not signature
+        ], [], commit=False)
+        mysql.set_variant_groups(build_group_updates(entries, mysql), commit=False)
+        mysql.commit_all()
+        indexed += len(rows)
+        print(f"Indexed {indexed} products")
+
+
+if __name__ == '__main__':
+    from backend.alchemy.database import MysqlConnection
+
+    db = MysqlConnection()
+    try:
+        print(f"Indexed {backfill(db)} products for similarity")
+    finally:
+        db.close_all()
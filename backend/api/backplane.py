@@ -0,0 +1,297 @@
+"""
+Pub/sub backplane shared by every API worker process.
+
+Scraper events (logs, stats, status) and control commands (stop) are published
+on named channels. Every worker subscribes, so a WebSocket client sees every
+job's progress and a stop request reaches the worker that runs the job, no matter
+which worker served the request.
+
+Brokers, picked with BACKPLANE_BROKER:
+- local: in-process only, for a single worker
+- unix: a Unix-socket hub next to the other backend files. The first worker to take
+  the lock file hosts the hub and the rest connect to it. If the host exits,
+  another worker takes over.
+- redis: Redis pub/sub (needs the optional `redis` package)
+
+publish() never blocks on I/O. Messages are queued for a writer thread and dropped
+if the queue is full.
+"""
+
+import os
+import json
+import queue
+import fcntl
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from backend.settings.config import BACKPLANE_CONFIG
+from backend.utils.logger import get_logger
+
+EVENTS_CHANNEL: str = 'scraper.events'
+CONTROL_CHANNEL: str = 'scraper.control'
+
+logger = get_logger('BACKPLANE')
+
+
+class Broker:
+    """In-process broker; the base for the cross-process ones."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def subscribe(self, channel: str, callback: Callable[[str, dict], None]):
+        """Call `callback(channel, message)` for every message on `channel`, from a broker thread."""
+        with self._lock:
+            if callback not in self._subscribers[channel]:
+                self._subscribers[channel].append(callback)
+
+    def unsubscribe(self, channel: str, callback: Callable[[str, dict], None]):
+        with self._lock:
+            if callback in self._subscribers[channel]:
+                self._subscribers[channel].remove(callback)
+
+    def publish(self, channel: str, message: dict):
+        self._deliver(channel, message)
+
+    def _deliver(self, channel: str, message: dict):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, ()))
+        for callback in callbacks:
+            try:
+                callback(channel, message)
+            except Exception as e:
+                logger.error('Subscriber for %s failed: %s' % (channel, str(e)))
+
+
+class QueuedBroker(Broker, ABC):
+    """Broker whose publishes go through a bounded outbound queue drained by a writer thread."""
+
+    OUTBOX_SIZE: int = 10000
+
+    def __init__(self):
+        super().__init__()
+        self._outbox = queue.Queue(maxsize=self.OUTBOX_SIZE)
+        self._closed = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self._spawn(self._write_loop, 'backplane-writer')
+        self._spawn(self._read_loop, 'backplane-reader')
+
+    def close(self):
+        self._closed.set()
+
+    def _spawn(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def publish(self, channel: str, message: dict):
+        try:
+            self._outbox.put_nowait((channel, message))
+        except queue.Full:
+            logger.warning('Backplane outbox full, dropping message on %s' % channel)
+
+    def _write_loop(self):
+        while not self._closed.is_set():
+            try:
+                channel, message = self._outbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._send(channel, message)
+            except Exception as e:
+                logger.warning('Backplane publish on %s failed: %s' % (channel, str(e)))
+
+    @abstractmethod
+    def _send(self, channel: str, message: dict):
+        """Send one message to the other workers; runs on the writer thread"""
+
+    @abstractmethod
+    def _read_loop(self):
+        """Receive messages until the broker is closed and hand them to _deliver"""
+
+
+class UnixSocketHub:
+    """Relays every line a client sends to all connected clients, including the sender."""
+
+    def __init__(self, server: socket.socket):
+        self.server = server
+        self.clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, name='backplane-hub', daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                return
+            client.settimeout(5)  # one stuck client must not stall the relay for long
+            with self._lock:
+                self.clients.append(client)
+            threading.Thread(target=self._relay_loop, args=(client,), name='backplane-hub-client', daemon=True).start()
+
+    def _relay_loop(self, client: socket.socket):
+        try:
+            with client.makefile('rb') as lines:
+                for line in lines:
+                    self._broadcast(line)
+        except OSError:
+            pass
+        finally:
+            self._drop(client)
+
+    def _broadcast(self, line: bytes):
+        with self._lock:
+            clients = list(self.clients)
+        for client in clients:
+            try:
+                client.sendall(line)
+            except OSError:
+                self._drop(client)
+
+    def _drop(self, client: socket.socket):
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+        client.close()
+
+
+class UnixSocketBroker(QueuedBroker):
+    RECONNECT_SECONDS: float = 1.0
+
+    def __init__(self, path: str = BACKPLANE_CONFIG['socket_path']):
+        super().__init__()
+        self.path = path
+        self._sock: Optional[socket.socket] = None
+        self._connected = threading.Event()
+        self._lock_file = None
+
+    def _connect(self) -> socket.socket:
+        self._try_host_hub()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _try_host_hub(self):
+        """Host the hub if no other worker holds the lock file."""
+        if self._lock_file is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open('%s.lock' % self.path, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return
+
+        # The lock is held until this process exits, so a socket file left here is stale
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(64)
+        UnixSocketHub(server).start()
+        self._lock_file = lock_file
+        logger.info('Hosting backplane hub on %s' % self.path)
+
+    def _read_loop(self):
+        while not self._closed.is_set():
+            try:
+                sock = self._connect()
+            except OSError:
+                self._closed.wait(self.RECONNECT_SECONDS)
+                continue
+            self._sock = sock
+            self._connected.set()
+            try:
+                with sock.makefile('rb') as lines:
+                    for line in lines:
+                        envelope = json.loads(line)
+                        self._deliver(envelope['channel'], envelope['message'])
+            except (OSError, ValueError, KeyError):
+                pass
+            finally:
+                self._connected.clear()
+                self._sock = None
+                sock.close()
+
+    def _send(self, channel: str, message: dict):
+        while not self._connected.wait(0.5):
+            if self._closed.is_set():
+                return
+        sock = self._sock
+        if sock is not None:
+            sock.sendall((json.dumps({'channel': channel, 'message': message}, default=str) + '\n').encode('utf-8'))
+
+
+class RedisBroker(QueuedBroker):
+    def __init__(self, url: str = BACKPLANE_CONFIG['redis_url'], prefix: str = BACKPLANE_CONFIG['redis_prefix']):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('BACKPLANE_BROKER=redis needs the redis package: pip install redis')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _send(self, channel: str, message: dict):
+        self.client.publish(self.prefix + channel, json.dumps(message, default=str))
+
+    def _read_loop(self):
+        while not self._closed.is_set():
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.prefix + '*')
+                for item in pubsub.listen():
+                    if self._closed.is_set():
+                        break
+                    channel = item['channel']
+                    if isinstance(channel, bytes):
+                        channel = channel.decode('utf-8')
+                    self._deliver(channel[len(self.prefix):], json.loads(item['data']))
+            except Exception as e:
+                logger.warning('Redis backplane connection lost: %s' % str(e))
+                self._closed.wait(1.0)
+
+
+BROKERS = {
+    'local': Broker,
+    'unix': UnixSocketBroker,
+    'redis': RedisBroker,
+}
+
+_broker: Optional[Broker] = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    """Return the process-wide broker chosen by BACKPLANE_BROKER, starting it on first use."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            name = BACKPLANE_CONFIG['broker']
+            if name not in BROKERS:
+                raise ValueError('BACKPLANE_BROKER must be one of: %s' % ', '.join(BROKERS))
+            _broker = BROKERS[name]()
+            _broker.start()
+        return _broker
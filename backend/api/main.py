@@ -1,10 +1,28 @@
-import uvicorn
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.routers import products, auth, scraper, system
+from backend.api.routers import products, auth, scraper, system, schedules
+from backend.settings.config import SCHEDULER_CONFIG
+from backend.api.backplane import CONTROL_CHANNEL, get_broker
+from backend.api.compression import CompressionMiddleware
 
-app = FastAPI(title='Products API', description='API for flipkart scraped products', version='1.0.0')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Every worker listens for job control commands, whichever worker received the request
+    broker = get_broker()
+    broker.subscribe(CONTROL_CHANNEL, scraper.handle_control)
+    scheduler = None
+    if SCHEDULER_CONFIG['enabled']:
+        from backend.modules.scheduler import get_scheduler
+        scheduler = get_scheduler()
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        scheduler.stop()
+    broker.close()
+
+app = FastAPI(title='Products API', description='API for flipkart scraped products', version='1.0.0', lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,12 +31,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
 api_router = APIRouter(prefix='/api', tags=['api'])
 api_router.include_router(products.router)
 api_router.include_router(auth.router, prefix='/auth')
 api_router.include_router(scraper.router, prefix='/scraper')
 api_router.include_router(system.router, prefix='/system')
+api_router.include_router(schedules.router, prefix='/schedules')
 
 @app.get('/')
 async def root():
@@ -27,4 +47,6 @@ async def root():
 app.include_router(api_router)
 
 if __name__ == '__main__':
+    import uvicorn
+
     uvicorn.run("backend.api.main:app", host='0.0.0.0', port=8000, reload=True)
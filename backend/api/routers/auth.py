@@ -3,21 +3,20 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from jose import JWTError, jwt
 
-from backend.settings.config import DB_URL, AUTH_CONFIG
+from backend.settings.config import AUTH_CONFIG
+from backend.alchemy.database import get_engine
 from backend.alchemy.models import User
 from backend.alchemy.schemas import Token, User as UserSchema, UserCreate, UserUpdate, UserAdminUpdate
 from backend.utils.auth import verify_password, create_access_token, get_password_hash
 
-# Database Dependency Setup
-engine = create_engine(DB_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database Dependency Setup; bound lazily to the shared engine, which connects on first use
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
@@ -1,52 +1,65 @@
-from fastapi import APIRouter, Query
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Query, HTTPException
 from typing import Optional, List
 from backend.alchemy.database import MysqlConnection
+from backend.alchemy.history import AVAILABILITY_NAMES
+from backend.alchemy.models import ArchivedProduct
+from backend.alchemy.schemas import ProductBatchRequest
+from backend.api.serialization import PRODUCT_FIELDS, ProductJSONResponse
+from backend.settings.config import FACETS_CONFIG, PRODUCT_BATCH_CONFIG
+from backend.utils.cache import TTLCache
 
 mysql = MysqlConnection()
+facets_cache = TTLCache(FACETS_CONFIG['cache_size'], FACETS_CONFIG['cache_ttl_seconds'])
+# Product rows by ('id', id) and ('product_id', product_id), for batch lookups
+product_cache = TTLCache(PRODUCT_BATCH_CONFIG['cache_size'], PRODUCT_BATCH_CONFIG['cache_ttl_seconds'])
 router = APIRouter(prefix='/products', tags=['products'])
 
 @router.get('/')
 def get_products(
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(20, ge=1, le=1000, description="Items per page")
+    limit: int = Query(20, ge=1, le=1000, description="Items per page"),
+    collapse_variants: bool = Query(False, description="Show one product per group of colour/storage variants")
 ):
-    products, total = mysql.get_products(page, limit)
+    products, total = mysql.get_products(page, limit, collapse_variants)
     total_pages = (total + limit - 1) // limit
     
-    return {
+    return ProductJSONResponse({
         "items": products,
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": total_pages
-    }
+    })
 
 @router.get('/category/{category}')
 def get_products_by_category(category: str):
     products = mysql.get_products_by_category(category)
-    return products
+    return ProductJSONResponse(products)
 
 @router.get('/brand/{brand}')
 def get_products_by_brand(brand: str):
     products = mysql.get_products_by_brand(brand)
-    return products
+    return ProductJSONResponse(products)
 
 @router.get('/search')
 def search_products(
     q: str = Query(..., description="Search query"),
     page: int = Query(1, ge=1, description="Page number"),
-    limit: int = Query(20, ge=1, le=1000, description="Items per page")
+    limit: int = Query(20, ge=1, le=1000, description="Items per page"),
+    collapse_variants: bool = Query(False, description="Show one product per group of colour/storage variants"),
+    include_archived: bool = Query(False, description="Also match products no longer listed, after the live ones")
 ):
-    products, total = mysql.search_products(q, page, limit)
+    products, total = mysql.search_products(q, page, limit, collapse_variants, include_archived)
     total_pages = (total + limit - 1) // limit
     
-    return {
+    return ProductJSONResponse({
         "items": products,
         "total": total,
         "page": page,
         "limit": limit,
         "total_pages": total_pages
-    }
+    })
 
 @router.get('/filter/price')
 def get_products_by_price_range(
@@ -54,34 +67,175 @@ def get_products_by_price_range(
     max_price: float = Query(..., description="Maximum price")
 ):
     products = mysql.get_products_by_price_range(min_price, max_price)
-    return products
+    return ProductJSONResponse(products)
 
 @router.get('/filter/rating')
 def get_products_by_rating(min_rating: float = Query(..., description="Minimum rating")):
     products = mysql.get_products_by_rating(min_rating)
-    return products
+    return ProductJSONResponse(products)
 
 @router.get('/filter/availability')
 def get_products_by_availability(status: str = Query("IN_STOCK", description="Availability status")):
     products = mysql.get_products_by_availability(status)
-    return products
+    return ProductJSONResponse(products)
 
 @router.get('/stats')
 def get_product_statistics():
     stats = mysql.get_product_statistics()
     return stats
 
+@router.get('/facets')
+def get_product_facets(
+    q: Optional[str] = Query(None, description="Search query"),
+    category: Optional[str] = Query(None),
+    brand: Optional[str] = Query(None),
+    availability: Optional[str] = Query(None),
+    min_price: Optional[float] = Query(None),
+    max_price: Optional[float] = Query(None),
+    min_rating: Optional[float] = Query(None)
+):
+    """Filter sidebar counts for a search/browse context, in one grouped query and cached briefly"""
+    filters = {
+        'q': q.strip().lower() if q else None,
+        'category': category,
+        'brand': brand,
+        'availability': availability,
+        'min_price': min_price,
+        'max_price': max_price,
+        'min_rating': min_rating,
+    }
+    key = tuple(sorted(filters.items()))
+    facets = facets_cache.get(key)
+    if facets is None:
+        facets = mysql.get_facets(FACETS_CONFIG['price_buckets'], **filters)
+        facets_cache.set(key, facets)
+    return facets
+
+@router.post('/batch')
+def get_products_batch(request: ProductBatchRequest):
+    """Look up many products by `ids` or `product_ids` at once
+
+    Items come back in request order, with null for keys that match no product;
+    those keys are also listed in `missing`.
+    """
+    if (request.ids is None) == (request.product_ids is None):
+        raise HTTPException(status_code=400, detail="Send exactly one of ids or product_ids")
+    key = 'id' if request.ids is not None else 'product_id'
+    keys = request.ids if request.ids is not None else request.product_ids
+    if len(keys) > PRODUCT_BATCH_CONFIG['max_keys']:
+        raise HTTPException(status_code=400, detail=f"At most {PRODUCT_BATCH_CONFIG['max_keys']} keys per request")
+    if request.fields is not None:
+        unknown = [field for field in request.fields if field not in PRODUCT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    found = {}
+    for value in keys:
+        row = product_cache.get((key, value))
+        if row is not None:
+            found[value] = row
+    misses = list({value for value in keys if value not in found})
+    if misses:
+        for product in mysql.get_products_by_keys(misses, key):
+            row = {field: getattr(product, field) for field in PRODUCT_FIELDS}
+            product_cache.set(('id', row['id']), row)
+            product_cache.set(('product_id', row['product_id']), row)
+            found[row[key]] = row
+    if request.include_archived:
+        # Not cached: archived rows are rare in lookups and move back when listed again
+        misses = list({value for value in keys if value not in found})
+        if misses:
+            for product in mysql.get_products_by_keys(misses, key, ArchivedProduct):
+                found[getattr(product, key)] = {field: getattr(product, field) for field in PRODUCT_FIELDS}
+
+    items = []
+    for value in keys:
+        row = found.get(value)
+        if row is not None and request.fields is not None:
+            row = {field: row[field] for field in request.fields}
+        items.append(row)
+    return ProductJSONResponse({
+        "items": items,
+        "missing": [value for value in dict.fromkeys(keys) if value not in found]
+    })
+
 @router.get('/trending')
-def get_trending_products(limit: int = Query(10, description="Number of trending products")):
-    products = mysql.get_trending_products(limit)
-    return products
+def get_trending_products(
+    limit: int = Query(10, ge=1, le=1000, description="Number of trending products"),
+    category: Optional[str] = Query(None, description="Leaderboard of one category")
+):
+    products = mysql.get_trending_products(limit, category)
+    return ProductJSONResponse(products)
 
 @router.get('/discounted')
-def get_discounted_products():
-    products = mysql.get_discounted_products()
-    return products
+def get_discounted_products(
+    limit: int = Query(100, ge=1, le=1000, description="Number of discounted products"),
+    category: Optional[str] = Query(None, description="Leaderboard of one category")
+):
+    products = mysql.get_discounted_products(limit, category)
+    return ProductJSONResponse(products)
+
+@router.get('/{id}/similar')
+def get_similar_products(
+    id: int,
+    limit: int = Query(10, ge=1, le=100, description="Number of similar products"),
+    min_similarity: float = Query(0.5, ge=0, le=1, description="Minimum estimated title/spec similarity")
+):
+    matches = mysql.get_similar_products(id, limit, min_similarity)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Product not found or not indexed yet")
+    return ProductJSONResponse([{"similarity": similarity, "product": product} for similarity, product in matches])
+
+@router.get('/{id}/history')
+def get_product_history(
+    id: int,
+    start: Optional[date] = Query(None, description="First day (defaults to 90 days ago)"),
+    end: Optional[date] = Query(None, description="Last day (defaults to today)"),
+    resolution: str = Query("daily", description="'daily' rollups or 'raw' points")
+):
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=90)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    if resolution == "daily":
+        points = [
+            {
+                "day": row.day.isoformat(),
+                "min": row.min_price,
+                "max": row.max_price,
+                "close": row.close_price,
+                "mrp": row.close_mrp,
+                "discount": row.close_discount,
+                "availability": AVAILABILITY_NAMES.get(row.close_availability, "UNKNOWN"),
+            }
+            for row in mysql.get_price_history(id, start, end)
+        ]
+    elif resolution == "raw":
+        range_start = datetime.combine(start, datetime.min.time())
+        range_end = datetime.combine(end, datetime.min.time()) + timedelta(days=1)
+        points = [
+            {
+                "time": row.recorded_at.isoformat(),
+                "price": row.price,
+                "mrp": row.mrp,
+                "discount": row.discount,
+                "availability": AVAILABILITY_NAMES.get(row.availability, "UNKNOWN"),
+            }
+            for row in mysql.get_raw_price_history(id, range_start, range_end)
+        ]
+    else:
+        raise HTTPException(status_code=400, detail="resolution must be 'daily' or 'raw'")
+
+    return {
+        "id": id,
+        "resolution": resolution,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": points
+    }
 
 @router.get('/{id}')
-def get_product(id: int):
-    product = mysql.get_product(id)
-    return product
+def get_product(id: int, include_archived: bool = Query(False, description="Fall back to archived products")):
+    product = mysql.get_product(id, include_archived)
+    return ProductJSONResponse(product)
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.api.routers.auth import get_admin_user, get_db
+from backend.api.routers.scraper import SCRAPER_ENGINES
+from backend.alchemy.models import User, ScrapeSchedule, ScheduleRun
+from backend.alchemy.schemas import (
+    Schedule as ScheduleSchema, ScheduleCreate, ScheduleUpdate, ScheduleRun as ScheduleRunSchema
+)
+from backend.modules.scheduler import OVERLAP_POLICIES, get_next_run
+from backend.utils.cron import CronExpression
+
+router = APIRouter(tags=["Schedules"])
+
+def validate_schedule(schedule: ScrapeSchedule):
+    if bool(schedule.cron) == bool(schedule.interval_seconds):
+        raise HTTPException(status_code=400, detail="Exactly one of cron or interval_seconds must be set")
+    if schedule.cron:
+        try:
+            CronExpression(schedule.cron)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if schedule.interval_seconds is not None and schedule.interval_seconds < 60:
+        raise HTTPException(status_code=400, detail="interval_seconds must be at least 60")
+    if schedule.jitter_seconds is not None and schedule.jitter_seconds < 0:
+        raise HTTPException(status_code=400, detail="jitter_seconds cannot be negative")
+    if schedule.max_pages < 1 or schedule.max_pages > 50:
+        raise HTTPException(status_code=400, detail="max_pages must be between 1 and 50")
+    if not schedule.query or not schedule.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    if schedule.engine not in SCRAPER_ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(SCRAPER_ENGINES)}")
+    if schedule.overlap_policy not in OVERLAP_POLICIES:
+        raise HTTPException(status_code=400, detail=f"overlap_policy must be one of: {', '.join(OVERLAP_POLICIES)}")
+
+def get_schedule_or_404(db: Session, schedule_id: int) -> ScrapeSchedule:
+    schedule = db.query(ScrapeSchedule).filter(ScrapeSchedule.id == schedule_id).first()
+    if not schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+def check_name(db: Session, name: str, schedule_id: int = None):
+    existing = db.query(ScrapeSchedule).filter(ScrapeSchedule.name == name).first()
+    if existing and existing.id != schedule_id:
+        raise HTTPException(status_code=400, detail="Schedule name already in use")
+
+@router.get("", response_model=list[ScheduleSchema])
+async def read_schedules(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    return db.query(ScrapeSchedule).order_by(ScrapeSchedule.id).all()
+
+@router.post("", response_model=ScheduleSchema)
+async def create_schedule(
+    payload: ScheduleCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    schedule = ScrapeSchedule(**payload.model_dump())
+    validate_schedule(schedule)
+    check_name(db, schedule.name)
+    schedule.refresh = int(payload.refresh)
+    schedule.enabled = int(payload.enabled)
+    schedule.next_run_at = get_next_run(schedule.cron, schedule.interval_seconds, schedule.jitter_seconds, datetime.utcnow())
+    db.add(schedule)
+    db.commit()
+    db.refresh(schedule)
+    return schedule
+
+@router.get("/{schedule_id}", response_model=ScheduleSchema)
+async def read_schedule(
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    return get_schedule_or_404(db, schedule_id)
+
+@router.put("/{schedule_id}", response_model=ScheduleSchema)
+async def update_schedule(
+    schedule_id: int,
+    payload: ScheduleUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    schedule = get_schedule_or_404(db, schedule_id)
+    changes = payload.model_dump(exclude_unset=True)
+    if changes.get('name'):
+        check_name(db, changes['name'], schedule.id)
+    # Switching between cron and interval clears the other one
+    if changes.get('cron'):
+        changes.setdefault('interval_seconds', None)
+    elif changes.get('interval_seconds'):
+        changes.setdefault('cron', None)
+    for key, value in changes.items():
+        setattr(schedule, key, int(value) if isinstance(value, bool) else value)
+    validate_schedule(schedule)
+
+    if {'cron', 'interval_seconds', 'jitter_seconds', 'enabled'} & changes.keys():
+        schedule.next_run_at = get_next_run(schedule.cron, schedule.interval_seconds, schedule.jitter_seconds, datetime.utcnow())
+    db.commit()
+    db.refresh(schedule)
+    return schedule
+
+@router.delete("/{schedule_id}")
+async def delete_schedule(
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    schedule = get_schedule_or_404(db, schedule_id)
+    db.query(ScheduleRun).filter(ScheduleRun.schedule_id == schedule.id).delete(synchronize_session=False)
+    db.delete(schedule)
+    db.commit()
+    return {"detail": "Schedule deleted successfully"}
+
+@router.get("/{schedule_id}/runs", response_model=list[ScheduleRunSchema])
+async def read_schedule_runs(
+    schedule_id: int,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    get_schedule_or_404(db, schedule_id)
+    return db.query(ScheduleRun).filter(
+        ScheduleRun.schedule_id == schedule_id
+    ).order_by(ScheduleRun.started_at.desc()).limit(min(max(limit, 1), 500)).all()
+
+@router.post("/{schedule_id}/run", response_model=ScheduleSchema)
+async def run_schedule_now(
+    schedule_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """Make a schedule due now; the scheduler fires it on its next poll, subject to the overlap policy."""
+    schedule = get_schedule_or_404(db, schedule_id)
+    if not schedule.enabled:
+        raise HTTPException(status_code=400, detail="Schedule is disabled")
+    schedule.next_run_at = datetime.utcnow()
+    db.commit()
+    db.refresh(schedule)
+    return schedule
@@ -1,36 +1,59 @@
+import uuid
+from datetime import datetime, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from backend.api.ws import manager
+from backend.api.backplane import CONTROL_CHANNEL, get_broker
 from backend.api.routers.auth import get_current_active_user, get_db
 from backend.alchemy.models import User
-from backend.modules.flipkart.main import FlipkartScraper
+from backend.modules.jobs import JobAlreadyActive, get_job_manager
+from backend.alchemy.database import MysqlConnection
+from backend.utils.egress_pool import get_egress_pool
+from backend.settings.config import SCHEDULER_CONFIG
 
 router = APIRouter(tags=["Scraper"])
 
+SCRAPER_ENGINES = ('html', 'api', 'auto')
+
 class ScraperRequest(BaseModel):
     query: str
     max_pages: int = 1
+    engine: str = 'html'
+    refresh: bool = False
 
-active_scraper = None
+def serialize_job(job) -> dict:
+    """A scrape_jobs row in the shape JobManager.list() uses, for jobs running on other workers"""
+    return {
+        "job_id": job.id,
+        "query": job.query,
+        "engine": job.engine,
+        "max_pages": job.max_pages,
+        "status": job.status,
+        "page": job.last_page + 1,
+        "stats": job.stats,
+        "updated_at": job.updated_at,
+    }
 
-def run_scraper_task(query: str, max_pages: int):
-    global active_scraper
-    scraper = FlipkartScraper()
-    scraper.MAX_PAGES = max_pages
-    active_scraper = scraper
-    try:
-        scraper.run(query)
-    finally:
-        active_scraper = None
+def get_stale_before() -> datetime:
+    """Running jobs that have not checkpointed since this time belong to a dead worker"""
+    return datetime.utcnow() - timedelta(seconds=SCHEDULER_CONFIG['stale_job_seconds'])
+
+def handle_control(channel: str, command: dict):
+    """Apply a control command published by whichever worker served the request"""
+    if command.get("command") != "stop":
+        return
+    if command.get("job_id"):
+        get_job_manager().cancel(command["job_id"])
+    else:
+        get_job_manager().cancel_all()
 
 @router.post("/start")
 async def start_scraper(
     payload: ScraperRequest,
-    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_active_user)
 ):
     if payload.max_pages < 1 or payload.max_pages > 50:
@@ -38,18 +61,139 @@ async def start_scraper(
     
     if not payload.query or len(payload.query.strip()) == 0:
         raise HTTPException(status_code=400, detail="Query cannot be empty")
+
+    if payload.engine not in SCRAPER_ENGINES:
+        raise HTTPException(status_code=400, detail=f"engine must be one of: {', '.join(SCRAPER_ENGINES)}")
         
-    background_tasks.add_task(run_scraper_task, payload.query, payload.max_pages)
+    job_id = uuid.uuid4().hex
+
+    def build():
+        # The scraper stack (curl_cffi, bs4, parse pool) is imported by the job thread on first use
+        from backend.modules.flipkart.auto import create_job
+        return create_job(payload.query, payload.max_pages, payload.engine, payload.refresh, job_id), payload.query
+
+    get_job_manager().submit(job_id, build, payload.query, payload.engine, payload.max_pages)
     
-    return {"message": f"Scraping started for '{payload.query}' up to {payload.max_pages} pages.", "status": "running"}
+    return {"message": f"Scraping started for '{payload.query}' up to {payload.max_pages} pages using the {payload.engine} engine.", "status": "running", "job_id": job_id}
+
+@router.get("/checkpoints")
+def list_checkpoints(
+    current_user: User = Depends(get_current_active_user)
+):
+    mysql = MysqlConnection()
+    try:
+        jobs = mysql.get_resumable_jobs(get_stale_before())
+        return [
+            {
+                "job_id": job.id,
+                "query": job.query,
+                "engine": job.engine,
+                "max_pages": job.max_pages,
+                "last_page": job.last_page,
+                "status": job.status,
+                "stats": job.stats,
+                "updated_at": job.updated_at,
+            }
+            for job in jobs
+        ]
+    finally:
+        mysql.close_all()
+
+@router.post("/resume/{job_id}")
+def resume_scraper(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    mysql = MysqlConnection()
+    try:
+        job = mysql.get_job(job_id)
+        running = job is not None and mysql.is_job_running(job_id, get_stale_before())
+    finally:
+        mysql.close_all()
+
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if running:
+        raise HTTPException(status_code=409, detail="Job is still running")
+    if job.last_page >= job.max_pages:
+        raise HTTPException(status_code=400, detail="Job already fetched all of its pages")
+
+    from backend.modules.flipkart.auto import resume_job
+    try:
+        get_job_manager().submit(job_id, lambda: resume_job(job_id), job.query, job.engine, job.max_pages)
+    except JobAlreadyActive:
+        raise HTTPException(status_code=409, detail="Job is still running")
+    return {"message": f"Resuming '{job.query}' from page {job.last_page + 1} of {job.max_pages}.", "status": "running", "job_id": job_id}
+
+@router.get("/jobs")
+def list_jobs(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Jobs queued or run by this worker, plus jobs running on other workers"""
+    jobs = get_job_manager().list()
+    local = {job["job_id"] for job in jobs}
+    mysql = MysqlConnection()
+    try:
+        jobs += [serialize_job(job) for job in mysql.get_running_jobs() if job.id not in local]
+    finally:
+        mysql.close_all()
+    return jobs
+
+@router.get("/egress")
+async def get_egress_status(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Health, rate budget use and quarantine state of this worker's egress endpoints"""
+    return get_egress_pool().snapshot()
+
+@router.get("/jobs/{job_id}")
+def get_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    job = get_job_manager().get(job_id)
+    if job is not None:
+        return job
+    mysql = MysqlConnection()
+    try:
+        stored = mysql.get_job(job_id)
+    finally:
+        mysql.close_all()
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(stored)
+
+@router.post("/jobs/{job_id}/stop")
+def stop_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    # Cancel here if the job is ours; the backplane reaches it if another worker runs it
+    if not get_job_manager().cancel(job_id):
+        mysql = MysqlConnection()
+        try:
+            running = mysql.is_job_running(job_id, get_stale_before())
+        finally:
+            mysql.close_all()
+        if not running:
+            raise HTTPException(status_code=404, detail="No active job with this id")
+        get_broker().publish(CONTROL_CHANNEL, {"command": "stop", "job_id": job_id})
+    return {"message": f"Stop requested for job {job_id}.", "status": "stopping", "job_id": job_id}
 
 @router.post("/stop")
-async def stop_scraper(
+def stop_scraper(
     current_user: User = Depends(get_current_active_user)
 ):
-    global active_scraper
-    if active_scraper:
-        active_scraper.is_cancelled = True
+    """Stop every job on every worker"""
+    mysql = MysqlConnection()
+    try:
+        # Rows a crashed worker left as running are past the stale window and do not count
+        running = mysql.get_running_jobs(stale_before=get_stale_before())
+    finally:
+        mysql.close_all()
+
+    if get_job_manager().cancel_all() or running:
+        get_broker().publish(CONTROL_CHANNEL, {"command": "stop"})
         return {"message": "Stop requested correctly. Scraper halting...", "status": "stopping"}
     
     return {"message": "No active scraper.", "status": "stopped"}
@@ -63,3 +207,13 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
+
+@router.websocket("/ws/{job_id}")
+async def job_websocket_endpoint(websocket: WebSocket, job_id: str):
+    """Events of a single job"""
+    await manager.connect(websocket, job_id)
+    try:
+        while True:
+            data = await websocket.receive_text()
+    except WebSocketDisconnect:
+        manager.disconnect(websocket)
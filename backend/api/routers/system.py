@@ -1,4 +1,3 @@
-import psutil
 import platform
 import os
 import time
@@ -14,6 +13,8 @@ BOOT_TIME = time.time()
 
 @router.get("/metrics")
 def get_system_metrics(current_user: User = Depends(get_admin_user)):
+    import psutil  # only admins open the metrics page, so workers do not load it at startup
+
     # Connect to MySQL to get row counts
     mysql = MysqlConnection()
     db_count = 0
@@ -50,7 +51,8 @@ def get_system_metrics(current_user: User = Depends(get_admin_user)):
         "os": platform.system(),
         "database": {
             "total_products": db_count,
-            "status": "connected"
+            "status": "connected",
+            "replicas": mysql.replica_set.snapshot() if mysql.replica_urls else []
         },
         "hardware": {
             "cpu_usage": cpu_usage,
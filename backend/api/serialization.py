@@ -0,0 +1,76 @@
+"""
+Fast JSON responses for product payloads.
+
+FastAPI runs returned ORM objects through jsonable_encoder field by field, which is
+slow for the large media/specifications/pricing columns. Product endpoints return a
+ProductJSONResponse instead. Each product is encoded once per row version, with
+orjson when it is installed, and the cached fragments are spliced into the response.
+
+A fragment is keyed by the row's table and id, its content_hash, and the columns
+written without changing the hash: time_update, variant_group, last_seen and the
+brand and score backfills. Every write to a product row changes one of them, so an
+updated row is simply encoded again. time_update alone is not enough: it has
+one-second precision, and a row rewritten within the second it was cached would
+keep its old fragment.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+
+from backend.alchemy.models import Products, ArchivedProduct
+from backend.settings.config import SERIALIZATION_CONFIG
+from backend.utils.cache import TTLCache
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library encoder
+    orjson = None
+
+PRODUCT_FIELDS = [column.name for column in Products.__table__.columns]
+
+fragments = TTLCache(SERIALIZATION_CONFIG['fragment_cache_size'], SERIALIZATION_CONFIG['fragment_ttl_seconds'])
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def product_fragment(product: Products) -> bytes:
+    key = (
+        product.__tablename__, product.id, product.content_hash, product.time_update, product.variant_group,
+        product.last_seen, product.brand, product.model, product.trending_score, product.discount,
+    )
+    fragment = fragments.get(key)
+    if fragment is None:
+        fragment = dumps({field: getattr(product, field) for field in PRODUCT_FIELDS})
+        fragments.set(key, fragment)
+    return fragment
+
+
+def encode(value: Any) -> bytes:
+    """JSON for `value`, with any Products inside it taken from the fragment cache"""
+    if isinstance(value, (Products, ArchivedProduct)):
+        return product_fragment(value)
+    if isinstance(value, (list, tuple)):
+        return b'[' + b','.join(encode(item) for item in value) + b']'
+    if isinstance(value, dict):
+        return b'{' + b','.join(dumps(str(key)) + b':' + encode(item) for key, item in value.items()) + b'}'
+    return dumps(value)
+
+
+class ProductJSONResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return encode(content)
@@ -1,48 +1,71 @@
 import json
-from typing import Dict, List
+import asyncio
+from typing import Dict, Optional
 from fastapi import WebSocket
 
+from backend.api.backplane import EVENTS_CHANNEL, get_broker
+
 class ConnectionManager:
+    """Publishes scraper events on the backplane and relays them to this worker's WebSockets.
+
+    The send_* methods are plain functions callable from scraper threads; delivery to
+    the sockets happens on the event loop that accepted them.
+    """
+
     def __init__(self):
-        # Allow multiple websocket connections per user session/task
-        self.active_connections: List[WebSocket] = []
+        # Allow multiple websocket connections per user session/task; each maps to the job it follows (None for all)
+        self.active_connections: Dict[WebSocket, Optional[str]] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, job_id: str = None):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            get_broker().subscribe(EVENTS_CHANNEL, self._on_event)
+        self.active_connections[websocket] = job_id
 
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+            del self.active_connections[websocket]
 
-    async def send_log(self, message: str, level: str = "info"):
+    def send_log(self, message: str, level: str = "info", job_id: str = None):
         """Send a standard log message to all connected clients"""
-        payload = {
+        self.publish({
             "type": "log",
             "level": level,    # info, success, warning, error
-            "message": message
-        }
-        await self.broadcast(payload)
-        
-    async def send_stats(self, stats: dict):
+            "message": message,
+            "job_id": job_id,
+        })
+
+    def send_stats(self, stats: dict, job_id: str = None):
         """Send statistical updates to all connected clients"""
-        payload = {
+        self.publish({
             "type": "stats",
-            "data": stats
-        }
-        await self.broadcast(payload)
-        
-    async def send_status(self, status: str):
-         """Send scraper status to all connected clients"""
-         payload = {
-             "type": "status",
-             "status": status # idle, running, completed, error
-         }
-         await self.broadcast(payload)
+            "data": dict(stats),
+            "job_id": job_id,
+        })
+
+    def send_status(self, status: str, job_id: str = None):
+        """Send scraper status to all connected clients"""
+        self.publish({
+            "type": "status",
+            "status": status,  # idle, running, completed, cancelled, error
+            "job_id": job_id,
+        })
+
+    def publish(self, payload: dict):
+        get_broker().publish(EVENTS_CHANNEL, payload)
+
+    def _on_event(self, channel: str, payload: dict):
+        # Called from a broker thread; hand the payload to the loop that owns the sockets
+        if self.active_connections and self.loop is not None and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.broadcast(payload), self.loop)
 
     async def broadcast(self, payload: dict):
         message = json.dumps(payload)
-        for connection in self.active_connections:
+        for connection, job_id in list(self.active_connections.items()):
+            if job_id is not None and job_id != payload.get("job_id"):
+                continue
             try:
                 await connection.send_text(message)
             except Exception:
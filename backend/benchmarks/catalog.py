@@ -0,0 +1,60 @@
+"""
+Synthetic catalog generator for load tests.
+
+Bulk-loads products built from synthetic_product through the same ProductRecord
+path the scrapers use, so the rows have the same JSON pricing/rating/specifications
+shapes as scraped ones. Works against SQLite or MySQL.
+
+usage:
+- python -m backend.benchmarks.catalog --url sqlite:///catalog.db --rows 1000000
+- python -m backend.benchmarks.catalog --rows 10000000 --batch 20000  # DB_URL from the environment
+- python -m backend.benchmarks.catalog --url sqlite:///catalog.db --rows 500000 --start 1000000  # append
+"""
+
+import time
+import random
+import argparse
+
+from backend.alchemy.models import Base
+from backend.alchemy.database import MysqlConnection
+from backend.alchemy.records import ProductRecord
+from backend.benchmarks.synthetic import synthetic_product
+
+BASE_URL = 'https://www.flipkart.com/'
+
+
+def generate(mysql: MysqlConnection, rows: int, start: int = 0, batch_size: int = 10000, seed: int = 7) -> float:
+    """Insert `rows` products numbered from `start` and return the seconds it took"""
+    rng = random.Random(seed + start)
+    started = time.perf_counter()
+    for offset in range(start, start + rows, batch_size):
+        end = min(offset + batch_size, start + rows)
+        batch = [ProductRecord.from_product(synthetic_product(i, rng), BASE_URL) for i in range(offset, end)]
+        mysql.insert_records(batch)
+        done = end - start
+        elapsed = time.perf_counter() - started
+        print(f"\r{done:>12,} / {rows:,} rows  {done / elapsed:>10,.0f} rows/s", end='', flush=True)
+    print()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='database URL (defaults to DB_URL)')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--start', type=int, default=0, help='first product number, to append to an existing catalog')
+    parser.add_argument('--batch', type=int, default=10000, help='rows per insert transaction')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    mysql = MysqlConnection(args.url) if args.url else MysqlConnection()
+    try:
+        Base.metadata.create_all(mysql.engine)
+        seconds = generate(mysql, args.rows, args.start, args.batch, args.seed)
+        print(f"Inserted {args.rows:,} products in {seconds:.1f}s")
+    finally:
+        mysql.close_all()
+
+
+if __name__ == '__main__':
+    main()
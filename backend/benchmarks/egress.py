@@ -0,0 +1,183 @@
+"""
+Throughput benchmark for the egress pool against local stand-in proxies.
+
+Starts a local origin server and N forwarding HTTP proxies in this process, then
+sends requests through EgressPool and curl_cffi from a number of concurrent workers,
+the way scrape jobs do. Each run is repeated for 1..N proxies, so the report shows
+throughput growing with the number of endpoints under a fixed per-endpoint rate
+budget. --ban and --fail make some proxies answer 429 or drop connections, to watch
+them being quarantined, probed and, with --recover-after, brought back.
+
+usage:
+- python -m backend.benchmarks.egress --proxies 4 --rate 5 --duration 10
+- python -m backend.benchmarks.egress --proxies 4 --ban 1 --fail 1 --recover-after 5 --quarantine 2
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from curl_cffi import requests
+
+from backend.utils.egress_pool import EgressPool
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    """Stands in for Flipkart: a small JSON page after a short delay"""
+    protocol_version = 'HTTP/1.1'
+    delay = 0.02
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """A forwarding proxy for plain HTTP; server.mode makes it ban or drop requests"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.server.mode == 'ban' and time.monotonic() < self.server.recover_at:
+            self.send_response(429)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.server.mode == 'fail' and time.monotonic() < self.server.recover_at:
+            self.close_connection = True
+            self.connection.close()
+            return
+
+        target = urlsplit(self.path)
+        connection = http.client.HTTPConnection(target.netloc, timeout=10)
+        try:
+            connection.request('GET', target.path + ('?' + target.query if target.query else ''))
+            response = connection.getresponse()
+            body = response.read()
+        finally:
+            connection.close()
+        self.send_response(response.status)
+        self.send_header('Content-Type', response.getheader('Content-Type', 'application/octet-stream'))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(handler, **attributes) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_pool(origin: str, proxies: list, workers: int, duration: float, rate: float, burst: int, quarantine: float) -> dict:
+    pool = EgressPool(
+        endpoints=proxies, rate_per_second=rate, burst=burst, failure_threshold=2,
+        quarantine_seconds=quarantine, max_quarantine_seconds=quarantine * 8, acquire_timeout_seconds=duration,
+    )
+    deadline = time.monotonic() + duration
+    counts = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def work(n: int):
+        session = requests.Session()
+        page = 0
+        while time.monotonic() < deadline:
+            try:
+                endpoint = pool.acquire(timeout=max(0.0, deadline - time.monotonic()))
+            except TimeoutError:
+                return
+            page += 1
+            started, status_code = time.monotonic(), None
+            try:
+                status_code = session.get('%s/search?worker=%s&page=%s' % (origin, n, page), timeout=10,
+                                          **endpoint.request_kwargs()).status_code
+            except Exception:
+                pass
+            finally:
+                pool.report(endpoint, time.monotonic() - started, status_code)
+            with lock:
+                counts['ok' if status_code == 200 else 'failed'] += 1
+
+    threads = [threading.Thread(target=work, args=(n,), daemon=True) for n in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'endpoints': len(proxies),
+        'ok': counts['ok'],
+        'failed': counts['failed'],
+        'ok_per_second': round(counts['ok'] / duration, 2),
+        'pool': pool.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--proxies', type=int, default=4, help='stand-in proxies to start')
+    parser.add_argument('--ban', type=int, default=0, help='how many of them answer 429')
+    parser.add_argument('--fail', type=int, default=0, help='how many of them drop connections')
+    parser.add_argument('--recover-after', type=float, default=float('inf'), help='seconds until banned/failing proxies recover')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requesters, like scrape jobs')
+    parser.add_argument('--rate', type=float, default=5, help='per-endpoint requests per second')
+    parser.add_argument('--burst', type=int, default=1)
+    parser.add_argument('--quarantine', type=float, default=2, help='first quarantine in seconds')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output', help='result file (default: results/egress-<label>-<timestamp>.json)')
+    args = parser.parse_args()
+
+    origin = start_server(OriginHandler)
+    origin_url = 'http://127.0.0.1:%s' % origin.server_address[1]
+    modes = ['ban'] * args.ban + ['fail'] * args.fail
+    modes += ['ok'] * (args.proxies - len(modes))
+
+    runs = []
+    for count in range(1, args.proxies + 1):
+        recover_at = time.monotonic() + args.recover_after
+        servers = [start_server(ProxyHandler, mode=mode, recover_at=recover_at) for mode in modes[-count:]]
+        proxies = ['http://127.0.0.1:%s' % server.server_address[1] for server in servers]
+        result = run_pool(origin_url, proxies, args.workers, args.duration, args.rate, args.burst, args.quarantine)
+        result['modes'] = modes[-count:]
+        runs.append(result)
+        print(f"{count} endpoint(s) {','.join(result['modes']):<24} {result['ok_per_second']:>7.2f} ok/s  "
+              f"{result['failed']} failed")
+        for endpoint in result['pool']:
+            print(f"    {endpoint['endpoint']:<26} {endpoint['state']:<12} requests {endpoint['requests']:<5} "
+                  f"failures {endpoint['failures']:<4} bans {endpoint['bans']:<4} success {endpoint['success_rate']}")
+        for server in servers:
+            server.shutdown()
+    origin.shutdown()
+
+    timestamp = datetime.utcnow().isoformat(timespec='seconds')
+    output = args.output or os.path.join(RESULTS_DIR, 'egress-%s-%s.json' % (args.label, timestamp.replace(':', '')))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'label': args.label, 'timestamp': timestamp, 'rate': args.rate, 'workers': args.workers,
+                   'duration': args.duration, 'runs': runs}, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Ingest benchmark: legacy dict + ORM objects versus compact ProductRecords.
+
+Measures retained memory per 100k products and products/sec for extraction alone
+and for extraction plus the bulk write into a scratch SQLite database.
+
+usage:
+- python -m backend.benchmarks.ingest
+- python -m backend.benchmarks.ingest --count 100000 --no-write
+"""
+
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from urllib.parse import urljoin
+
+from sqlalchemy.orm import Session
+
+from backend.alchemy.models import Base, Products
+from backend.alchemy.database import MysqlConnection
+from backend.alchemy.records import ProductRecord, get_content_hash
+from backend.benchmarks.synthetic import synthetic_product
+
+BASE_URL = 'https://www.flipkart.com/'
+
+
+def legacy_details(product: dict) -> dict:
+    """The per-product dict get_product_details built before ProductRecord"""
+    availability = product.get('availability', {}).get('displayState', 'No availability information available')
+    product_details = {
+        'product_id': product['id'],
+        'title': product['titles']['title'],
+        'url': urljoin(BASE_URL, product['baseUrl']),
+        'rating': product.get('rating', 'No rating available'),
+        'specifications': product.get('keySpecs', 'No specifications available'),
+        'media': [img['url'] for img in product['media']['images']],
+        'pricing': product.get('pricing', 'No pricing information available'),
+        'category': product['vertical'],
+        'warrantySummary': product.get('warrantySummary', 'No warranty information available'),
+        'availability': availability,
+        'source': 'flipkart',
+    }
+    product_details['content_hash'] = get_content_hash(product_details)
+    return product_details
+
+
+def build_legacy(payloads: list) -> list:
+    return [Products(**legacy_details(json.loads(payload))) for payload in payloads]
+
+
+def build_records(payloads: list) -> list:
+    return [ProductRecord.from_product(json.loads(payload), BASE_URL) for payload in payloads]
+
+
+def measure(build, products: list):
+    """Retained bytes and seconds to build one batch from the products' raw JSON"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    batch = build(products)
+    seconds = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return batch, retained, seconds
+
+
+def write_legacy(batch: list) -> float:
+    mysql = MysqlConnection('sqlite://')
+    Base.metadata.create_all(mysql.engine)
+    started = time.perf_counter()
+    with Session(mysql.engine) as session:
+        session.add_all(batch)
+        session.commit()
+    return time.perf_counter() - started
+
+
+def write_records(batch: list) -> float:
+    mysql = MysqlConnection('sqlite://')
+    Base.metadata.create_all(mysql.engine)
+    started = time.perf_counter()
+    mysql.insert_records(batch)
+    seconds = time.perf_counter() - started
+    mysql.close_all()
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100000, help='products per run')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--no-write', action='store_true', help='skip the SQLite bulk write stage')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Products start as JSON text, the way they arrive from a page, so both paths pay for decoding
+    products = [json.dumps(synthetic_product(i, rng)) for i in range(args.count)]
+    per_100k = 100000 / args.count
+
+    print(f"{'path':<10}{'MB/100k':>12}{'build/s':>14}{'write/s':>14}")
+    for name, build, write in (('legacy', build_legacy, write_legacy), ('records', build_records, write_records)):
+        batch, retained, seconds = measure(build, products)
+        write_rate = '-'
+        if not args.no_write:
+            write_rate = '%.0f' % (args.count / write(batch))
+        print(f"{name:<10}{retained * per_100k / 1024 / 1024:>12.1f}{args.count / seconds:>14.0f}{write_rate:>14}")
+        del batch
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Load-test driver for the products API.
+
+Replays a weighted mix of product endpoints from a fixed number of concurrent
+keep-alive connections (closed loop), then reports throughput, error rate and
+p50/p95/p99 latency per endpoint. Every run is saved as JSON so runs can be
+compared, e.g. before and after an index change or at 1M versus 10M rows.
+
+usage:
+- python -m backend.benchmarks.loadtest --concurrency 32 --duration 60 --label 1m-rows
+- python -m backend.benchmarks.loadtest --mix product=10,search=2 --duration 30
+- python -m backend.benchmarks.loadtest --label after --compare backend/benchmarks/results/loadtest-before-....json
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from datetime import datetime
+from urllib.parse import urlsplit, urlencode, quote
+
+from backend.benchmarks.synthetic import BRANDS, VERTICALS
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# name: (default weight, path builder); paths are relative to the API prefix
+ENDPOINTS = {
+    'list': (20, lambda rng, ctx: '/products/?' + urlencode({'page': rng.randint(1, ctx['pages']), 'limit': 20})),
+    'product': (30, lambda rng, ctx: '/products/%s' % rng.randint(1, ctx['total'])),
+    'search': (15, lambda rng, ctx: '/products/search?' + urlencode({'q': rng.choice(BRANDS), 'limit': 20})),
+    'category': (5, lambda rng, ctx: '/products/category/%s' % quote(rng.choice(VERTICALS))),
+    'brand': (5, lambda rng, ctx: '/products/brand/%s' % quote(rng.choice(BRANDS))),
+    'filter_price': (8, lambda rng, ctx: '/products/filter/price?' + urlencode(
+        dict(zip(('min_price', 'max_price'), sorted(rng.randrange(5000, 150000, 500) for _ in range(2))))
+    )),
+    'filter_rating': (5, lambda rng, ctx: '/products/filter/rating?' + urlencode({'min_rating': rng.choice([3.5, 4, 4.5])})),
+    'filter_availability': (3, lambda rng, ctx: '/products/filter/availability?status=IN_STOCK'),
+    'trending': (5, lambda rng, ctx: '/products/trending?limit=10'),
+    'stats': (4, lambda rng, ctx: '/products/stats'),
+}
+
+
+def parse_mix(mix: str) -> dict:
+    """'product=10,search=2' -> {'product': 10, 'search': 2}; unknown names raise ValueError"""
+    if not mix:
+        return {name: weight for name, (weight, _) in ENDPOINTS.items()}
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError('Unknown endpoint %r, expected one of: %s' % (name, ', '.join(ENDPOINTS)))
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Worker(threading.Thread):
+    """One keep-alive connection issuing requests back to back until the deadline"""
+
+    def __init__(self, base_url: str, weights: dict, ctx: dict, seed: int, record_after: float, deadline: float):
+        super().__init__(daemon=True)
+        parts = urlsplit(base_url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.names = list(weights)
+        self.weights = [weights[name] for name in self.names]
+        self.ctx = ctx
+        self.rng = random.Random(seed)
+        self.record_after = record_after
+        self.deadline = deadline
+        self.samples = []  # (endpoint, seconds, ok)
+        self.connection = None
+
+    def request(self, path: str) -> bool:
+        if self.connection is None:
+            self.connection = self.connection_class(self.netloc, timeout=30)
+        try:
+            self.connection.request('GET', self.prefix + path)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status < 400
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            return False
+
+    def run(self):
+        while True:
+            started = time.perf_counter()
+            if started >= self.deadline:
+                break
+            name = self.rng.choices(self.names, self.weights)[0]
+            ok = self.request(ENDPOINTS[name][1](self.rng, self.ctx))
+            if started >= self.record_after:
+                self.samples.append((name, time.perf_counter() - started, ok))
+        if self.connection is not None:
+            self.connection.close()
+
+
+def get_catalog_size(base_url: str) -> int:
+    parts = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    connection = connection_class(parts.netloc, timeout=30)
+    try:
+        connection.request('GET', parts.path.rstrip('/') + '/products/?page=1&limit=1')
+        response = connection.getresponse()
+        return json.loads(response.read())['total']
+    finally:
+        connection.close()
+
+
+def summarize(samples: list, seconds: float) -> dict:
+    latencies = sorted(latency for _, latency, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'rps': len(samples) / seconds if seconds else 0.0,
+        'mean_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        'p50_ms': 1000 * percentile(latencies, 0.50),
+        'p95_ms': 1000 * percentile(latencies, 0.95),
+        'p99_ms': 1000 * percentile(latencies, 0.99),
+    }
+
+
+def run_load(base_url: str, weights: dict, concurrency: int, duration: float, warmup: float, seed: int) -> dict:
+    total = get_catalog_size(base_url)
+    if not total:
+        raise SystemExit('The catalog is empty; load it with python -m backend.benchmarks.catalog first')
+    ctx = {'total': total, 'pages': max(1, total // 20)}
+
+    started = time.perf_counter()
+    record_after = started + warmup
+    deadline = record_after + duration
+    workers = [Worker(base_url, weights, ctx, seed + n, record_after, deadline) for n in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    by_endpoint = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample[0], []).append(sample)
+    return {
+        'catalog_size': total,
+        'overall': summarize(samples, duration),
+        'endpoints': {name: summarize(by_endpoint[name], duration) for name in sorted(by_endpoint)},
+    }
+
+
+def print_report(result: dict, baseline: dict = None):
+    header = f"{'endpoint':<22}{'req':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'Δrps':>9}{'Δp95':>9}"
+    print(header)
+    rows = list(result['endpoints'].items()) + [('overall', result['overall'])]
+    for name, stats in rows:
+        line = (f"{name:<22}{stats['requests']:>8}{stats['rps']:>9.1f}{stats['error_rate'] * 100:>7.1f}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+        if baseline:
+            before = baseline['overall'] if name == 'overall' else baseline['endpoints'].get(name)
+            if before and before['rps'] and before['p95_ms']:
+                line += f"{(stats['rps'] / before['rps'] - 1) * 100:>+8.0f}%{(stats['p95_ms'] / before['p95_ms'] - 1) * 100:>+8.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000/api')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds of unrecorded traffic first')
+    parser.add_argument('--mix', default='', help='weighted endpoints, e.g. product=10,search=2 (default: built-in mix)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output', help='result file (default: results/loadtest-<label>-<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier result file to show deltas against')
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    result = run_load(args.base_url, weights, args.concurrency, args.duration, args.warmup, args.seed)
+    result.update(
+        label=args.label,
+        timestamp=datetime.utcnow().isoformat(timespec='seconds'),
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        mix=weights,
+    )
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, 'loadtest-%s-%s.json' % (args.label, result['timestamp'].replace(':', ''))
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
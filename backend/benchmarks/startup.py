@@ -0,0 +1,136 @@
+"""
+Cold-start benchmark for API workers.
+
+Imports a module in fresh interpreters and reports the median import time, the
+resident memory once it is loaded, how many modules came along and which heavy
+optional modules (scraper, HTML parsing, system metrics) were pulled in. The
+slowest imports are listed from `python -X importtime`. Runs are saved as JSON, like
+loadtest, so a change can be compared with an earlier run.
+
+usage:
+- python -m backend.benchmarks.startup
+- python -m backend.benchmarks.startup --module backend.modules.scheduler --runs 5
+- python -m backend.benchmarks.startup --label after --compare backend/benchmarks/results/startup-before-....json
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Only needed once a scrape starts or an admin opens the metrics page
+HEAVY_MODULES = ('bs4', 'curl_cffi', 'psutil', 'backend.modules.flipkart.main')
+
+PROBE = r'''
+import sys, time, json
+started = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - started
+rss_kb = 0
+try:
+    with open('/proc/self/status') as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+except (OSError, StopIteration):
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'seconds': seconds,
+    'rss_kb': rss_kb,
+    'modules': len(sys.modules),
+    'heavy': [name for name in json.loads(sys.argv[2]) if name in sys.modules],
+}))
+'''
+
+
+def probe(module: str, env: dict, importtime: bool = False) -> tuple:
+    """One fresh-interpreter import of `module`: (measurements, -X importtime output)"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', PROBE, module, json.dumps(HEAVY_MODULES)]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_imports(importtime_output: str, top: int) -> list:
+    """[(cumulative ms, module)] of the slowest top-level imports in `python -X importtime` output"""
+    imports = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        # Nested imports are indented; only direct imports add up to the total
+        if name.startswith(' ') and not name.startswith('  '):
+            imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def run_startup(module: str, runs: int, top: int) -> dict:
+    env = dict(os.environ)
+    # Startup must not need a reachable database or a configured scraper
+    env.setdefault('DATABASE_URL', 'sqlite://')
+    samples = [probe(module, env)[0] for _ in range(runs)]
+    _, importtime_output = probe(module, env, importtime=True)
+    return {
+        'module': module,
+        'runs': runs,
+        'import_ms': round(statistics.median(sample['seconds'] for sample in samples) * 1000, 1),
+        'import_ms_min': round(min(sample['seconds'] for sample in samples) * 1000, 1),
+        'rss_mb': round(statistics.median(sample['rss_kb'] for sample in samples) / 1024, 1),
+        'modules': samples[-1]['modules'],
+        'heavy_modules': samples[-1]['heavy'],
+        'slowest_imports': slowest_imports(importtime_output, top),
+    }
+
+
+def print_report(result: dict, baseline: dict = None):
+    def delta(key):
+        if not baseline or not baseline.get(key):
+            return ''
+        return f"  ({(result[key] / baseline[key] - 1) * 100:+.0f}%)"
+
+    print(f"module           {result['module']}")
+    print(f"import (median)  {result['import_ms']} ms{delta('import_ms')}  min {result['import_ms_min']} ms")
+    print(f"rss              {result['rss_mb']} MB{delta('rss_mb')}")
+    print(f"modules loaded   {result['modules']}{delta('modules')}")
+    print(f"heavy modules    {', '.join(result['heavy_modules']) or 'none'}")
+    print('slowest imports:')
+    for milliseconds, name in result['slowest_imports']:
+        print(f"  {milliseconds:>8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='backend.api.main', help='module a worker imports at startup')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--label', default='run')
+    parser.add_argument('--output', help='result file (default: results/startup-<label>-<timestamp>.json)')
+    parser.add_argument('--compare', help='earlier result file to show deltas against')
+    args = parser.parse_args()
+
+    result = run_startup(args.module, args.runs, args.top)
+    result.update(label=args.label, timestamp=datetime.utcnow().isoformat(timespec='seconds'))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, 'startup-%s-%s.json' % (args.label, result['timestamp'].replace(':', ''))
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved results to {output}")
+
+
+if __name__ == '__main__':
+    main()
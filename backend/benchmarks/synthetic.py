@@ -0,0 +1,61 @@
+"""
+Synthetic Flipkart products shaped like the productInfo values the scrapers parse.
+
+Used by the benchmarks to generate realistic payloads without touching Flipkart.
+"""
+
+import random
+
+BRANDS = ['Samsung', 'Apple', 'Xiaomi', 'Realme', 'OnePlus', 'Vivo', 'OPPO', 'Motorola', 'Nothing', 'Google']
+VERTICALS = ['mobile', 'laptop', 'headphone', 'smartwatch', 'television', 'tablet']
+COLORS = ['Black', 'Blue', 'Green', 'Silver', 'Midnight', 'Purple']
+AVAILABILITY = ['IN_STOCK'] * 8 + ['OUT_OF_STOCK', 'COMING_SOON']
+
+
+def synthetic_product(i: int, rng: random.Random = random) -> dict:
+    """A productInfo value with the same nesting and rough size as a real search result"""
+    brand = rng.choice(BRANDS)
+    ram = rng.choice([4, 6, 8, 12, 16])
+    storage = rng.choice([64, 128, 256, 512])
+    mrp = rng.randrange(5000, 150000, 500)
+    discount = rng.randrange(0, 60)
+    price = mrp - mrp * discount // 100
+    count = rng.randrange(0, 200000)
+    return {
+        'id': 'SYN%012d' % i,
+        'titles': {'title': '%s Model %s (%s, %s GB)' % (brand, i % 997, rng.choice(COLORS), storage)},
+        'baseUrl': '/%s-model-%s/p/itm%012d' % (brand.lower(), i % 997, i),
+        'vertical': rng.choice(VERTICALS),
+        'productBrand': brand,
+        'rating': {
+            'type': 'ProductRating',
+            'average': round(rng.uniform(1, 5), 1),
+            'base': 5,
+            'breakup': [rng.randrange(0, 1000) for _ in range(5)],
+            'count': count,
+            'histogramBaseCount': count,
+            'reviewCount': count // 10,
+            'roundOffCount': '%s' % count,
+        },
+        'keySpecs': [
+            '%s GB RAM | %s GB ROM' % (ram, storage),
+            '16.94 cm (6.67 inch) Full HD+ Display',
+            '50MP + 8MP | 16MP Front Camera',
+            '5000 mAh Battery',
+        ],
+        'media': {'images': [
+            {'url': 'https://rukminim2.flixcart.com/image/{@width}/{@height}/syn/%s-%s.jpeg' % (i, n)}
+            for n in range(rng.randrange(3, 8))
+        ]},
+        'pricing': {
+            'discountAmount': mrp - price,
+            'prices': [
+                {'strikeOff': True, 'value': mrp, 'priceType': 'MRP'},
+                {'strikeOff': False, 'value': price, 'priceType': 'FSP'},
+            ],
+            'showDiscountAsAmount': False,
+            'totalDiscount': discount,
+        },
+        'warrantySummary': '1 Year Manufacturer Warranty',
+        'availability': {'displayState': rng.choice(AVAILABILITY)},
+    }
@@ -1,36 +1,59 @@
 """
-This module contains the FlipkartApiScraper class, 
+This module contains the FlipkartApiScraper class,
 which is used to scrape Flipkart products using the API.
 
 supports pagination and saving to database.
 """
 
 import time
+import random
+import string
+from urllib.parse import urlencode
 
-from retry import retry
 from curl_cffi import requests
 
 from backend.utils.logger import get_logger
+from backend.alchemy.database import MysqlConnection
+from backend.api.ws import manager
 from backend.modules.flipkart.main import FlipkartScraper
-from backend.utils.cookies_getter import CookiesHeadersGetter
+from backend.modules.flipkart.sinks import ProductSink
+from backend.modules.jobs import cancellable_retry
+from backend.utils.session_pool import get_session_pool
+from backend.modules.flipkart.parser import RawPage, get_api_products, parse_api_page
 
 class FlipkartApiScraper(FlipkartScraper):
     BASE_URL: str = "https://1.rome.api.flipkart.com/api/4/page/fetch"
     MODULE: str = 'FLIPKART_API'
-    ENABLE_PAGINATION: bool = False
+    ENABLE_PAGINATION: bool = True
+    AUTH_FAILURE_CODES: tuple = (401, 403)
 
-    def __init__(self):
-        super().__init__()
-        self.client = CookiesHeadersGetter()
-        self.cookies = self.client.get_cookies()
-        self.headers = self.client.get_headers()
+    def __init__(self, mysql: MysqlConnection = None, sink: ProductSink = None, events=manager):
+        super().__init__(mysql, sink, events)
+        self.session_pool = get_session_pool()
+        self.session = self.session_pool.acquire()
+        self.ssid = self.generate_request_id()
         self.logger = get_logger(self.MODULE)
         self.logger.info('Initializing Flipkart API Scraper...')
-    
-    @retry(Exception, tries=3, delay=2)
-    def get_response(self, query: str) -> dict:
+
+    @staticmethod
+    def generate_request_id() -> str:
+        """Build an id shaped like Flipkart's ssid/sqid: 16 random base36 chars + epoch millis."""
+        prefix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=16))
+        return '%s%s' % (prefix, int(time.time() * 1000))
+
+    @cancellable_retry(tries=3, delay=2)
+    def get_response(self, query: str) -> requests.Response:
+        params = {
+            'q': query,
+            'otracker': 'search',
+            'otracker1': 'search',
+            'marketplace': 'FLIPKART',
+            'as-show': 'off',
+            'as': 'off',
+            'page': self.PAGE,
+        }
         json_data = {
-            'pageUri': '/search?q=%s&otracker=search&otracker1=search&marketplace=FLIPKART&as-show=off&as=off&page=%s' % (query, self.PAGE),
+            'pageUri': '/search?%s' % urlencode(params),
             'pageContext': {
                 'fetchSeoData': True,
                 'paginatedFetch': True,
@@ -38,49 +61,28 @@ class FlipkartApiScraper(FlipkartScraper):
             },
             'requestContext': {
                 'type': 'BROWSE_PAGE',
-                'ssid': '71zejon5o00000001756378958593',
-                'sqid': 'yplr55f5z40000001756413455265',
+                'ssid': self.ssid,
+                'sqid': self.generate_request_id(),
             },
         }
 
-        response = requests.post(self.BASE_URL, cookies=self.cookies, headers=self.headers, json=json_data)
+        response = self.send_request('POST', self.BASE_URL, cookies=self.session.cookies, headers=self.session.headers, json=json_data)
+        if response.status_code in self.AUTH_FAILURE_CODES:
+            # Hand the rejected session back for a background refresh and retry with the next one
+            self.session_pool.report_failure(self.session)
+            self.session = self.session_pool.acquire()
+            raise Exception('Session rejected by %s: %s' % (self.BASE_URL, response.status_code))
         if not response.ok:
             raise Exception('Failed to fetch URL: %s Reason: %s' % (self.BASE_URL, response.reason))
-        return response.json()
-    
+        return response
+
     def get_products(self, json_response: dict) -> list:
-        PRODUCTS = []
-        for slot in json_response['RESPONSE']['slots']:
-            if slot['slotType'] == 'WIDGET' and slot['widget']['type'] == 'PRODUCT_SUMMARY':
-                PRODUCTS.append(slot['widget']['data']['products'][0]['productInfo']['value'])
-        return PRODUCTS
-    
-    def start(self, query: str):
-        response = self.get_response(query)
-        products = self.get_products(response)
-        for product in products:
-            product_details = self.get_product_details(product)
-            self.save_to_db(product_details)
+        return get_api_products(json_response)
 
-    def run(self):
-        self.logger.info('Flipkart API Scraper Started')
-        query = 'Mobile Phones'
-        if self.ENABLE_PAGINATION:
-            self.logger.info('PAGINATION ENABLED')
-            self.logger.info('Starting from page %s -> %s' % (self.PAGE, self.PAGE + self.MAX_PAGES))
-            while self.PAGE <= self.MAX_PAGES:
-                self.logger.info('Fetching page %s' % self.PAGE)
-                self.start(query)
-                self.logger.info('Sleeping for 5 seconds...')
-                time.sleep(5)
-                self.PAGE += 1
-            self.logger.info('All pages fetched')
-            self.logger.info('Flipkart API Scraper Completed')
-            return
-        
-        self.logger.info('Getting response for query: %s' % query)
-        self.start(query)
-        self.logger.info('Flipkart API Scraper Completed')
+    def fetch_page(self, query: str) -> RawPage:
+        self._log('Getting JSON response from Flipkart API', level="info", stage="fetch")
+        response = self.get_response(query)
+        return RawPage(self.PAGE, response.content, parse_api_page)
 
 def run():
     return FlipkartApiScraper()
@@ -0,0 +1,175 @@
+"""
+This module contains the FlipkartAutoScraper class,
+which picks between the HTML and API engines per job and fails over mid-job.
+
+The choice is driven by EngineSelector, a process-wide record of recent page
+outcomes (success rate and products per second) for each engine.
+"""
+
+import time
+import uuid
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from backend.alchemy.database import MysqlConnection
+from backend.modules.flipkart.main import FlipkartScraper
+from backend.modules.flipkart.api import FlipkartApiScraper
+from backend.modules.flipkart.parser import RawPage
+from backend.alchemy.records import encode_json
+
+ENGINES: Dict[str, type] = {
+    'api': FlipkartApiScraper,
+    'html': FlipkartScraper,
+}
+
+
+class EngineSelector:
+    """Rolling window of page outcomes per engine used to rank them."""
+
+    WINDOW_SIZE: int = 20
+    WINDOW_SECONDS: int = 3600
+
+    def __init__(self):
+        self._samples: Dict[str, deque] = {name: deque(maxlen=self.WINDOW_SIZE) for name in ENGINES}
+        self._lock = threading.Lock()
+
+    def record(self, engine: str, ok: bool, products: int = 0, seconds: float = 0.0):
+        with self._lock:
+            self._samples[engine].append((time.time(), ok, products, seconds))
+
+    def score(self, engine: str) -> Optional[float]:
+        """Success rate times throughput over the window, or None when there is no recent data."""
+        cutoff = time.time() - self.WINDOW_SECONDS
+        with self._lock:
+            samples = [sample for sample in self._samples[engine] if sample[0] >= cutoff]
+        if not samples:
+            return None
+        success_rate = sum(1 for sample in samples if sample[1]) / len(samples)
+        products = sum(sample[2] for sample in samples)
+        seconds = sum(sample[3] for sample in samples) or 1.0
+        return success_rate * (products / seconds)
+
+    def choose(self) -> str:
+        # Engines without recent samples are tried first so every path keeps getting measured
+        best_engine, best_score = None, -1.0
+        for engine in ENGINES:
+            score = self.score(engine)
+            if score is None:
+                return engine
+            if score > best_score:
+                best_engine, best_score = engine, score
+        return best_engine
+
+    def ranked(self, first: str) -> list:
+        return [first] + [engine for engine in ENGINES if engine != first]
+
+
+engine_selector = EngineSelector()
+
+
+class FlipkartAutoScraper(FlipkartScraper):
+    MODULE: str = 'FLIPKART_AUTO'
+
+    def __init__(self, mysql: MysqlConnection = None):
+        super().__init__(mysql)
+        self.engine = engine_selector.choose()
+        self.engines: Dict[str, FlipkartScraper] = {}
+        self.page_engines: Dict[int, tuple] = {}
+        self._log('Auto mode selected engine: %s' % self.engine, level="info")
+
+    def get_engine(self, name: str) -> FlipkartScraper:
+        if name not in self.engines:
+            # Engines only fetch pages; saving and stats stay on this scraper
+            self.engines[name] = ENGINES[name](mysql=self.mysql)
+            # Share the cancel event so a stop also interrupts the engine's retry waits
+            self.engines[name].cancelled = self.cancelled
+        return self.engines[name]
+
+    def fetch_page(self, query: str) -> RawPage:
+        last_error = None
+        for name in engine_selector.ranked(self.engine):
+            started = time.time()
+            try:
+                engine = self.get_engine(name)
+                engine.PAGE = self.PAGE
+                raw_page = engine.fetch_page(query)
+            except Exception as e:
+                engine_selector.record(name, False, seconds=time.time() - started)
+                self._log('Engine %s failed on page %s: %s' % (name, self.PAGE, str(e)), level="warning", stage="fetch")
+                last_error = e
+                continue
+
+            # Success is recorded once the page has been parsed and its products counted
+            self.page_engines[raw_page.page] = (name, time.time() - started)
+            if name != self.engine:
+                self._log('Failing over from %s to %s engine' % (self.engine, name), level="warning", stage="fetch")
+                self.engine = name
+            return raw_page
+        raise last_error
+
+    def process_page(self, raw_page: RawPage) -> int:
+        name, seconds = self.page_engines.pop(raw_page.page, (self.engine, 0.0))
+        try:
+            products = super().process_page(raw_page)
+        except Exception:
+            engine_selector.record(name, False, seconds=seconds)
+            raise
+        engine_selector.record(name, True, products, seconds)
+        return products
+
+
+def build_scraper(engine: str = 'html') -> FlipkartScraper:
+    """Create a scraper for an engine name: 'html', 'api' or 'auto'."""
+    if engine == 'auto':
+        return FlipkartAutoScraper()
+    return ENGINES[engine]()
+
+
+def get_params_hash(query: str, max_pages: int, engine: str, refresh: bool) -> str:
+    params = {'query': query, 'max_pages': max_pages, 'engine': engine, 'refresh': bool(refresh)}
+    return hashlib.sha1(encode_json(params).encode('utf-8')).hexdigest()
+
+
+def create_job(query: str, max_pages: int, engine: str = 'html', refresh: bool = False,
+               job_id: Optional[str] = None) -> FlipkartScraper:
+    """Build a scraper for a new checkpointed job and record the job before it starts."""
+    scraper = build_scraper(engine)
+    scraper.MAX_PAGES = max_pages
+    scraper.REFRESH = refresh
+    scraper.job_id = job_id or uuid.uuid4().hex
+    scraper.mysql.create_job({
+        'id': scraper.job_id,
+        'query': query,
+        'engine': engine,
+        'max_pages': max_pages,
+        'refresh': int(bool(refresh)),
+        'params_hash': get_params_hash(query, max_pages, engine, refresh),
+        'last_page': 0,
+        'stats': scraper.stats,
+        'status': 'running',
+    })
+    return scraper
+
+
+def resume_job(job_id: str) -> tuple:
+    """Build a scraper that continues a checkpointed job from the page after its last committed one.
+
+    Returns (scraper, query); raises LookupError if the job does not exist.
+    """
+    mysql = MysqlConnection()
+    try:
+        job = mysql.get_job(job_id)
+        if job is None:
+            raise LookupError('Job %s not found' % job_id)
+
+        scraper = build_scraper(job.engine)
+        scraper.MAX_PAGES = job.max_pages
+        scraper.REFRESH = bool(job.refresh)
+        scraper.PAGE = job.last_page + 1
+        scraper.job_id = job.id
+        scraper.stats.update(job.stats or {})
+        return scraper, job.query
+    finally:
+        mysql.close_all()
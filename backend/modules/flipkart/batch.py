@@ -0,0 +1,162 @@
+"""
+Headless batch scraper.
+
+Runs a file of search queries, --parallel at a time, without the API server, MySQL
+or the WebSocket manager. Every product goes to a partitioned output directory
+through a sink (see sinks.py), or to the database with --format db. Requests still
+go through the egress pool, so EGRESS_CONFIG's rate budgets set the pace and more
+EGRESS_ENDPOINTS make a run faster.
+
+The queries file has one query per line; blank lines and lines starting with # are
+skipped. A summary of the run is written next to the output as _batch-<run>.json.
+
+usage:
+- python -m backend.modules.flipkart.batch queries.txt --output data/products
+- python -m backend.modules.flipkart.batch queries.txt --format parquet --parallel 8 --max-pages 25
+- python -m backend.modules.flipkart.batch queries.txt --format db  # regular database ingest
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.utils.logger import get_logger
+from backend.modules.flipkart.main import FlipkartScraper
+from backend.modules.flipkart.parser import get_parse_pool
+from backend.modules.flipkart.sinks import SINKS
+
+MODULE = 'FLIPKART_BATCH'
+logger = get_logger(MODULE)
+
+
+class NoEvents:
+    """Stands in for the WebSocket manager; scraper messages still reach the log."""
+
+    def send_log(self, message: str, level: str = "info", job_id: str = None):
+        pass
+
+    def send_stats(self, stats: dict, job_id: str = None):
+        pass
+
+    def send_status(self, status: str, job_id: str = None):
+        pass
+
+
+def read_queries(path: str) -> list:
+    """Queries in file order, without blanks, comments and repeats (searches ignore case)"""
+    queries = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            query = ' '.join(line.split())
+            if query and not query.startswith('#'):
+                queries.setdefault(query.lower(), query)
+    return list(queries.values())
+
+
+def get_engine(name: str) -> type:
+    if name == 'api':
+        # Only API runs need the session pool and its headless browser
+        from backend.modules.flipkart.api import FlipkartApiScraper
+        return FlipkartApiScraper
+    return FlipkartScraper
+
+
+class BatchRun:
+    def __init__(self, engine: type, sink, max_pages: int):
+        self.engine = engine
+        self.sink = sink
+        self.max_pages = max_pages
+        self.events = NoEvents()
+        self.cancelled = threading.Event()
+        self.scrapers = []
+        self._lock = threading.Lock()
+
+    def scrape(self, query: str) -> dict:
+        if self.cancelled.is_set():
+            return {'query': query, 'status': 'cancelled', 'seconds': 0.0}
+        scraper = self.engine(sink=self.sink, events=self.events)
+        scraper.MAX_PAGES = self.max_pages
+        with self._lock:
+            self.scrapers.append(scraper)
+        started = time.perf_counter()
+        try:
+            scraper.run(query)
+        finally:
+            if scraper.mysql is not None:
+                scraper.mysql.close_all()
+        result = {'query': query, 'status': scraper.status, 'seconds': round(time.perf_counter() - started, 1)}
+        result.update(scraper.stats)
+        logger.info('%(query)r %(status)s: %(total_scraped)s products from %(pages_processed)s pages in %(seconds)ss' % result)
+        return result
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._lock:
+            for scraper in self.scrapers:
+                scraper.is_cancelled = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('queries', help='file with one search query per line')
+    parser.add_argument('--output', default='output', help='output directory for file formats')
+    parser.add_argument('--format', default='ndjson', choices=sorted(SINKS) + ['db'])
+    parser.add_argument('--parallel', type=int, default=4, help='queries scraped at the same time')
+    parser.add_argument('--max-pages', type=int, default=FlipkartScraper.MAX_PAGES)
+    parser.add_argument('--engine', default='html', choices=('html', 'api'))
+    args = parser.parse_args()
+
+    queries = read_queries(args.queries)
+    if not queries:
+        raise SystemExit('No queries in %s' % args.queries)
+    sink = SINKS[args.format](args.output) if args.format != 'db' else None
+    run = BatchRun(get_engine(args.engine), sink, args.max_pages)
+    logger.info('Scraping %s queries, %s at a time, into %s' % (
+        len(queries), args.parallel, args.output if sink else 'the database'
+    ))
+
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max(1, args.parallel), thread_name_prefix='batch')
+    futures = [executor.submit(run.scrape, query) for query in queries]
+    try:
+        results = [future.result() for future in futures]
+    except KeyboardInterrupt:
+        logger.warning('Interrupted, stopping the running queries...')
+        run.cancel()
+        results = [future.result() for future in futures]
+    finally:
+        executor.shutdown(wait=True)
+        if sink is not None:
+            sink.close()
+        get_parse_pool().shutdown()
+
+    seconds = time.perf_counter() - started
+    products = sum(result.get('total_scraped', 0) for result in results)
+    summary = {
+        'started_at': started_at.isoformat(timespec='seconds'),
+        'seconds': round(seconds, 1),
+        'format': args.format,
+        'engine': args.engine,
+        'parallel': args.parallel,
+        'max_pages': args.max_pages,
+        'products': products,
+        'products_per_second': round(products / seconds, 2) if seconds else 0.0,
+        'queries': results,
+    }
+    if sink is not None:
+        os.makedirs(args.output, exist_ok=True)
+        with open(os.path.join(args.output, '_batch-%s.json' % sink.run_id), 'w') as f:
+            json.dump(summary, f, indent=2)
+    failed = [result['query'] for result in results if result['status'] == 'error']
+    logger.info('Done: %s products from %s queries in %.1fs, %s failed' % (products, len(results), seconds, len(failed)))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
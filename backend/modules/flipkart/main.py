@@ -2,76 +2,128 @@
 This module contains the FlipkartScraper class, 
 which is used to scrape Flipkart products using the search URL with BeautifulSoup.
 
-supports pagination and saving to database.
+supports pagination and saving to database, or to a sink (see sinks.py) when
+run without one.
 """
 
 import os
-import time
 import json
+import time
+import queue
+import threading
 
-from retry import retry
-from bs4 import BeautifulSoup
 from curl_cffi import requests
 from urllib.parse import urljoin
-import asyncio
 
-from backend.utils.logger import get_logger
+from backend.utils.logger import get_logger, LogSampler
+from backend.modules.jobs import JobCancelled, cancellable_retry
 from backend.alchemy.database import MysqlConnection
+from backend.alchemy.history import build_history_rows
 from backend.api.ws import manager
+from backend.utils.egress_pool import get_egress_pool
+from backend.settings.config import PARSER_CONFIG, SIMILARITY_CONFIG
+from backend.alchemy.similarity import build_group_updates
+from backend.modules.flipkart.sinks import ProductSink
+from backend.alchemy.records import ProductRecord, VOLATILE_FIELDS, get_content_hash
+from backend.modules.flipkart.parser import (
+    RawPage, INITIAL_STATE_MARKER, get_parse_pool, get_search_products, parse_search_page
+)
 
 class FlipkartScraper:
     BASE_URL: str = "https://www.flipkart.com/"
+    PRODUCT_BASE_URL: str = BASE_URL
     MODULE: str = 'FLIPKART'
     SEARCH_URL: str = urljoin(BASE_URL, "search")
     FILES_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'files')
-    if not os.path.exists(FILES_DIR):
-        os.makedirs(FILES_DIR)
     ENABLE_PAGINATION: bool = True
     MAX_PAGES: int = 10
     PAGE: int = 1
     IMPERSONATE: str = 'chrome136'
+    REFRESH: bool = False
+    REQUEST_TIMEOUT: int = 30
+    AUTH_FAILURE_CODES: tuple = ()  # statuses that reject the scraper's session, not its egress endpoint
+    VOLATILE_FIELDS: tuple = VOLATILE_FIELDS
     
-    def __init__(self):
+    def __init__(self, mysql: MysqlConnection = None, sink: ProductSink = None, events=manager):
         self.logger = get_logger(self.MODULE)
-        self.mysql: MysqlConnection = MysqlConnection()
+        self.sampler = LogSampler()  # keeps per-product messages from flooding the log and WebSocket
+        # With a sink the scraper never touches the database; events receives the WebSocket messages
+        self.sink = sink
+        self.mysql: MysqlConnection = None if sink is not None else mysql or MysqlConnection()
+        self.events = events
+        self.query = None
+        self.egress = get_egress_pool()  # shared by all jobs; its rate budgets pace the requests
         
         # Analytics Tracking
         self.stats = {
             "total_scraped": 0,
             "duplicates": 0,
+            "changed": 0,
+            "unchanged": 0,
             "errors": 0,
             "pages_processed": 0
         }
-        self.is_cancelled = False
+        self.cancelled = threading.Event()  # every wait in the scrape loop wakes up when this is set
+        self.status = None  # final job status once run() returns
+        self.job_id = None  # set to checkpoint progress in scrape_jobs after every page
         self._log('Initializing Flipkart Scraper...', level="info")
 
-    def _dispatch_ws(self, coro):
-        """Helper to run async websocket broadcasts from synchronous scraper methods."""
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # We are in an event loop (e.g., BackgroundTasks in FastAPI)
-                loop.create_task(coro)
-            else:
-                loop.run_until_complete(coro)
-        except RuntimeError:
-            # Create a new event loop if there is none
-            asyncio.run(coro)
+    @property
+    def is_cancelled(self) -> bool:
+        return self.cancelled.is_set()
 
-    def _log(self, message: str, level: str = "info"):
+    @is_cancelled.setter
+    def is_cancelled(self, value: bool):
+        if value:
+            self.cancelled.set()
+            self.egress.wake()  # a job waiting for the rate budget stops now, not at the next poll
+        else:
+            self.cancelled.clear()
+
+    def _log(self, message: str, level: str = "info", stage: str = None):
+        extra = {'job_id': self.job_id, 'stage': stage}
         if level == "error":
-            self.logger.error(message)
+            self.logger.error(message, extra=extra)
         elif level == "warning":
-            self.logger.warning(message)
+            self.logger.warning(message, extra=extra)
         else:
-            self.logger.info(message)
+            self.logger.info(message, extra=extra)
             
-        self._dispatch_ws(manager.send_log(message, level))
+        self.events.send_log(message, level, self.job_id)
+
+    def _log_product(self, kind: str, message: str, level: str = "info", stage: str = "save"):
+        """Per-product message, sampled; every one is still counted for the page summary."""
+        if self.sampler.allow(kind):
+            self._log(message, level=level, stage=stage)
+
+    def _log_summary(self, page: int):
+        summary = self.sampler.summary()
+        if summary:
+            self._log(f'Page {page}: {summary}', level="info", stage="save")
         
     def _update_stats(self):
-        self._dispatch_ws(manager.send_stats(self.stats))
+        self.events.send_stats(self.stats, self.job_id)
+
+    def send_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the healthiest egress endpoint and report how it went."""
+        asked = time.monotonic()
+        endpoint = self.egress.acquire(self.cancelled)
+        if endpoint is None:
+            raise JobCancelled('Job cancelled')
+        started = time.monotonic()
+        status_code = None
+        try:
+            if started - asked >= 1:
+                self._log('Waited %.1f seconds for the egress rate budget' % (started - asked), level="info", stage="fetch")
+                started = time.monotonic()
+            response = requests.request(method, url, timeout=self.REQUEST_TIMEOUT, **kwargs, **endpoint.request_kwargs())
+            status_code = response.status_code
+            return response
+        finally:
+            self.egress.report(endpoint, time.monotonic() - started, status_code,
+                               auth_failure=status_code in self.AUTH_FAILURE_CODES)
 
-    @retry(Exception, tries=3, delay=2)
+    @cancellable_retry(tries=3, delay=2)
     def get_response(self, url: str, query: str = None) -> requests.Response:
         params = {
             'q': query,
@@ -82,121 +134,259 @@ class FlipkartScraper:
             'as': 'off',
             'page': self.PAGE
         }
-        response = requests.get(url, params=params, impersonate=self.IMPERSONATE)
+        response = self.send_request('GET', url, params=params, impersonate=self.IMPERSONATE)
         if not response.ok:
             raise Exception('Failed to fetch URL: %s Reason: %s' % (url, response.reason))
         
         return response
     
-    def get_json_response(self, soup: BeautifulSoup) -> dict:
-        script = soup.find('script', id='is_script')
-        if script:
-            try:
-                script_text = script.string.replace('window.__INITIAL_STATE__ = ', '').rstrip(';')
-                return json.loads(script_text)
-            except json.JSONDecodeError:
-                self.stats["errors"] += 1
-                self._update_stats()
-                self._log('Failed to parse JSON data', level="error")
-                return {}
-        self.stats["errors"] += 1
-        self._update_stats()
-        self._log('No script found with id: is_script', level="error")
-        return {}
-    
     def get_products(self, json_response: dict) -> list:
-        PRODUCTS = []
-        for item in json_response['pageDataV4']['page']['data'].values():
-            for slot in item:
-                if slot['slotType'] == 'WIDGET' and slot['widget']['type'] == 'PRODUCT_SUMMARY':
-                    PRODUCTS.append(slot['widget']['data']['products'][0]['productInfo']['value'])
-        return PRODUCTS
-
+        return get_search_products(json_response)
 
     def get_product_details(self, product: dict) -> dict:
-        availability = product.get('availability', {}).get('displayState', 'No availability information available')
-        return {
-            'product_id': product['id'],
-            'title': product['titles']['title'],
-            'url': urljoin(self.BASE_URL, product['baseUrl']),
-            'rating': product.get('rating', 'No rating available'),
-            'specifications': product.get('keySpecs', 'No specifications available'),
-            'media': [img['url'] for img in product['media']['images']],
-            'pricing': product.get('pricing', 'No pricing information available'),
-            'category': product['vertical'],
-            'warrantySummary': product.get('warrantySummary', 'No warranty information available'),
-            'availability': availability,
-            'source': 'flipkart',
-        }
+        return ProductRecord.from_product(product, self.PRODUCT_BASE_URL).to_dict()
+
+    def get_content_hash(self, product_details: dict) -> str:
+        """Hash the fields that change between scrapes so unchanged rows can be skipped."""
+        return get_content_hash(product_details, self.VOLATILE_FIELDS)
     
     def save_to_json(self, data: dict, filename: str):
+        os.makedirs(self.FILES_DIR, exist_ok=True)
         with open(f'{self.FILES_DIR}/{filename}.json', 'w') as f:
             json.dump(data, f, indent=4)
 
     def save_to_db(self, product_details: dict):
-        if not self.mysql.exists(product_details['product_id']):
-            self.mysql.insert(product_details)
-            self.stats["total_scraped"] += 1
-            self._log('Product saved: %s' % (product_details.get('title', 'Unknown')[:50] + '...'), level="success")
-        else:
-            self.stats["duplicates"] += 1
-            self._log('Duplicate skipped: %s' % (product_details.get('title', 'Unknown')[:50] + '...'), level="warning")
+        self.save_products([ProductRecord.from_details(product_details)])
+
+    def save_products(self, records: list, commit: bool = True):
+        """Write a page of product records, comparing content hashes in bulk against stored rows."""
+        product_ids = [record.product_id for record in records]
+        # Archived products listed again come back under their old ids before the hash comparison
+        self.mysql.restore_products(product_ids, commit=False)
+        existing = self.mysql.get_content_hashes(product_ids)
+        inserts, updates, seen = [], [], []
+        for record in records:
+            title = (record.title or 'Unknown')[:50] + '...'
+            stored = existing.get(record.product_id)
+            if stored is None:
+                inserts.append(record)
+                self._log_product('Product saved', 'Product saved: %s' % title, level="success")
+            elif not self.REFRESH:
+                seen.append(stored[0])
+                self.stats["duplicates"] += 1
+                self._log_product('Duplicate skipped', 'Duplicate skipped: %s' % title, level="warning")
+            elif stored[1] == record.content_hash:
+                seen.append(stored[0])
+                self.stats["unchanged"] += 1
+            else:
+                updates.append((stored[0], record))
+                self._log_product('Product updated', 'Product updated: %s' % title, level="success")
+
+        self.mysql.insert_records(inserts, commit=False)
+        self.mysql.update_records(updates, commit=False)
+        self.mysql.mark_seen(seen, commit=False)
+        ids = self.get_record_ids(inserts, updates)
+        self.save_price_history(inserts + [record for _, record in updates], ids)
+        self.index_variants(inserts, ids)
+        if commit:
+            self.mysql.commit_all()
+        self.stats["total_scraped"] += len(inserts)
+        self.stats["changed"] += len(updates)
+        if self.REFRESH:
+            self._log('Refresh: %s new, %s changed, %s unchanged' % (
+                len(inserts), len(updates), len(records) - len(inserts) - len(updates)
+            ), level="info", stage="save")
         self._update_stats()
 
-    def start(self, query: str):
+    def get_record_ids(self, inserts: list, updates: list) -> dict:
+        """Map product_id -> products.id for the rows just written in the current transaction."""
+        ids = {record.product_id: id for id, record in updates}
+        if inserts:
+            inserted = self.mysql.get_content_hashes([record.product_id for record in inserts])
+            ids.update({product_id: stored[0] for product_id, stored in inserted.items()})
+        return ids
+
+    def save_price_history(self, records: list, ids: dict):
+        """Append a history point for every new or changed product in the current transaction."""
+        self.mysql.record_price_history(build_history_rows(records, ids), commit=False)
+
+    def index_variants(self, inserts: list, ids: dict):
+        """Add new products to the similarity index and assign their variant groups."""
+        if not SIMILARITY_CONFIG['enabled']:
+            return
+        entries = [(ids[record.product_id], record.minhash) for record in inserts if record.product_id in ids]
+        self.mysql.set_variant_groups(build_group_updates(entries, self.mysql), commit=False)
+
+    def fetch_page(self, query: str) -> RawPage:
+        """Fetch the current page as raw bytes, leaving decoding to the parse stage."""
         response = self.get_response(self.SEARCH_URL, query)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        self._log('Getting JSON response from Flipkart', level="info")
-        json_response = self.get_json_response(soup)
-        products = self.get_products(json_response)
-        
-        self._log(f'Extracted {len(products)} products from layout slot', level="info")
-        for product in products:
-            if self.is_cancelled:
-                break
-            try:
-                product_details = self.get_product_details(product)
-                self.save_to_db(product_details)
-            except Exception as e:
-                self.stats["errors"] += 1
-                self._update_stats()
-                self._log(f"Error processing product details: {str(e)}", level="error")
-                
-        self.stats["pages_processed"] += 1
+        if INITIAL_STATE_MARKER not in response.content:
+            raise Exception('No product data found on page %s' % self.PAGE)
+        return RawPage(self.PAGE, response.content, parse_search_page)
+
+    def process_page(self, raw_page: RawPage) -> int:
+        """Decode a fetched page in the parse pool, save the extracted products and return their count."""
+        try:
+            page_products, errors = get_parse_pool().parse(raw_page, self.PRODUCT_BASE_URL)
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._update_stats()
+            raise Exception('Failed to parse page %s: %s' % (raw_page.page, str(e)))
+
+        for error in errors:
+            self.stats["errors"] += 1
+            self._log_product('Invalid product', f"Error processing product details: {error}", level="error", stage="parse")
+        self._log(f'Extracted {len(page_products)} products from page {raw_page.page}', level="info", stage="parse")
+
+        # Products repeated within a page would otherwise collide on the unique product_id
+        unique_products = list({record.product_id: record for record in page_products}.values())
+        if self.is_cancelled:
+            return len(page_products)
+
+        if self.sink is not None:
+            self.sink.write(self.query, raw_page.page, unique_products)
+            self.stats["total_scraped"] += len(unique_products)
+            self.stats["pages_processed"] += 1
+            self._log_summary(raw_page.page)
+            self._update_stats()
+            return len(page_products)
+
+        self.save_page(raw_page.page, unique_products)
+        self._log_summary(raw_page.page)
         self._update_stats()
+        return len(page_products)
+
+    def save_page(self, page: int, records: list):
+        """Save a page in one transaction; if that fails, roll it back and save the products one at a time."""
+        stats = dict(self.stats)
+        try:
+            self.save_products(records, commit=False)
+            self.commit_page(page)
+        except Exception as e:
+            self.mysql.session.rollback()
+            self.stats.update(stats)
+            self.sampler.summary()  # drops the counts of the rolled back attempt
+            self._log(f'Failed to save page {page} in one transaction, saving its products one by one: {str(e).splitlines()[0]}',
+                      level="warning", stage="save")
+            for record in records:
+                stats = dict(self.stats)
+                try:
+                    self.save_products([record], commit=True)
+                except Exception as e:
+                    # A bad row or a concurrent job inserting the same product_id only loses that product
+                    self.mysql.session.rollback()
+                    self.stats.update(stats)
+                    self.stats["errors"] += 1
+                    self._log_product('Product not saved', f"Error saving product {record.product_id}: {str(e).splitlines()[0]}",
+                                      level="error")
+            self.commit_page(page)
+
+    def commit_page(self, page: int):
+        self.stats["pages_processed"] += 1
+        if self.job_id:
+            # The checkpoint commits with the page's rows, so a resume never skips or repeats a page
+            self.mysql.save_checkpoint(self.job_id, page, self.stats, commit=False)
+        self.mysql.commit_all()
+
+    def start(self, query: str):
+        self.query = query
+        try:
+            raw_page = self.fetch_page(query)
+        except JobCancelled:
+            return
+        except Exception:
+            self.stats["errors"] += 1
+            self._update_stats()
+            raise
+        self.process_page(raw_page)
+
+    def _put_page(self, pages: queue.Queue, item, stopped: threading.Event) -> bool:
+        # Blocks while the parse stage is behind, giving up once the job is cancelled or has failed
+        while True:
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self.is_cancelled or stopped.is_set():
+                    return False
+
+    def _fetch_pages(self, query: str, pages: queue.Queue, stopped: threading.Event):
+        """Fetch stage: push raw pages into the bounded queue, then a None sentinel."""
+        try:
+            while self.PAGE <= self.MAX_PAGES and not (self.is_cancelled or stopped.is_set()):
+                self._log(f'--- Fetching page {self.PAGE} of {self.MAX_PAGES} ---', level="info", stage="fetch")
+                try:
+                    raw_page = self.fetch_page(query)
+                except JobCancelled:
+                    return  # a cancelled job is not an error; the finally block ends the parse stage
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    self._update_stats()
+                    self._put_page(pages, e, stopped)
+                    return
+                # No fixed delay between pages: send_request waits for the egress rate budget
+                if not self._put_page(pages, raw_page, stopped):
+                    return
+                self.PAGE += 1
+        finally:
+            self._put_page(pages, None, stopped)
+
+    def finish_job(self, status: str):
+        self.status = status
+        if not self.job_id:
+            return
+        try:
+            self.mysql.finish_job(self.job_id, status, self.stats)
+        except Exception as e:
+            self._log(f"Failed to record job status: {str(e)}", level="error")
 
     def run(self, query: str = 'Mobile Phones'):
-        self._dispatch_ws(manager.send_status("running"))
+        self.query = query
+        self.events.send_status("running", self.job_id)
         self._log(f'Starting Scrape Job for query: "{query}"', level="info")
         
         try:
             if self.ENABLE_PAGINATION:
                 self._log('PAGINATION ENABLED. target max pages: %s' % self.MAX_PAGES, level="info")
-                while self.PAGE <= self.MAX_PAGES:
-                    if self.is_cancelled:
-                        self._log('Scrape Job Cancelled by User', level="warning")
-                        break
-                        
-                    self._log(f'--- Fetching page {self.PAGE} of {self.MAX_PAGES} ---', level="info")
-                    self.start(query)
-                    
-                    if self.is_cancelled:
-                        self._log('Scrape Job Cancelled by User', level="warning")
-                        break
-                        
-                    if self.PAGE < self.MAX_PAGES:
-                        self._log('Sleeping for 5 seconds to prevent rate limiting...', level="warning")
-                        time.sleep(5)
-                    self.PAGE += 1
+                pages = queue.Queue(maxsize=PARSER_CONFIG['queue_size'])
+                stopped = threading.Event()
+                fetcher = threading.Thread(target=self._fetch_pages, args=(query, pages, stopped), daemon=True)
+                fetcher.start()
+                try:
+                    while not self.is_cancelled:
+                        try:
+                            # Polled so a cancel returns at once even while the fetcher is mid-request
+                            item = pages.get(timeout=0.1)
+                        except queue.Empty:
+                            continue
+                        if item is None:
+                            break
+                        if isinstance(item, Exception):
+                            if self.is_cancelled:
+                                break
+                            raise item
+                        self.process_page(item)
+                finally:
+                    stopped.set()
+
             else:
                 self.start(query)
-                
-            self._log('Scrape Job Completed Successfully', level="success")
-            self._dispatch_ws(manager.send_status("completed"))
+
+            if self.is_cancelled:
+                self._log('Scrape Job Cancelled by User', level="warning")
+                self.finish_job("cancelled")
+                self.events.send_status("cancelled", self.job_id)
+            else:
+                self._log('Scrape Job Completed Successfully', level="success")
+                self.finish_job("completed")
+                self.events.send_status("completed", self.job_id)
             
         except Exception as e:
+            if self.mysql is not None:
+                self.mysql.session.rollback()
             self._log(f"Fatal error during script run: {str(e)}", level="error")
-            self._dispatch_ws(manager.send_status("error"))
+            self.finish_job("error")
+            self.events.send_status("error", self.job_id)
 
 def run():
     return FlipkartScraper()
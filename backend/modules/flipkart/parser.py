@@ -0,0 +1,117 @@
+"""
+Page parsing for the Flipkart scrapers.
+
+The functions here are pure and importable without the database or WebSocket
+stack, so raw page bytes can be shipped to a process pool and only compact
+ProductRecords come back. ParsePool owns that pool; with
+PARSER_WORKERS=0 pages are parsed inline instead.
+"""
+
+import json
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from backend.settings.config import PARSER_CONFIG
+from backend.alchemy.records import ProductRecord
+
+INITIAL_STATE_MARKER: bytes = b'window.__INITIAL_STATE__'
+
+# A fetched page waiting to be parsed; `parser` is one of the parse_* functions below
+RawPage = namedtuple('RawPage', 'page body parser')
+
+
+def get_initial_state(html: bytes) -> dict:
+    """Decode the window.__INITIAL_STATE__ JSON embedded in a search page."""
+    soup = BeautifulSoup(html, 'html.parser')
+    script = soup.find('script', id='is_script')
+    if not script or not script.string:
+        raise ValueError('No script found with id: is_script')
+    script_text = script.string.replace('window.__INITIAL_STATE__ = ', '').rstrip(';')
+    try:
+        return json.loads(script_text)
+    except json.JSONDecodeError:
+        raise ValueError('Failed to parse JSON data')
+
+
+def get_search_products(json_response: dict) -> list:
+    PRODUCTS = []
+    for item in json_response['pageDataV4']['page']['data'].values():
+        for slot in item:
+            if slot['slotType'] == 'WIDGET' and slot['widget']['type'] == 'PRODUCT_SUMMARY':
+                PRODUCTS.append(slot['widget']['data']['products'][0]['productInfo']['value'])
+    return PRODUCTS
+
+
+def get_api_products(json_response: dict) -> list:
+    PRODUCTS = []
+    for slot in json_response['RESPONSE']['slots']:
+        if slot['slotType'] == 'WIDGET' and slot['widget']['type'] == 'PRODUCT_SUMMARY':
+            PRODUCTS.append(slot['widget']['data']['products'][0]['productInfo']['value'])
+    return PRODUCTS
+
+
+def extract_all(products: list, base_url: str) -> Tuple[list, list]:
+    """ProductRecords for every product that passed validation, plus the error messages."""
+    records, errors = [], []
+    for product in products:
+        try:
+            records.append(ProductRecord.from_product(product, base_url))
+        except Exception as e:
+            errors.append(str(e))
+    return records, errors
+
+
+def parse_search_page(body: bytes, base_url: str) -> Tuple[list, list]:
+    return extract_all(get_search_products(get_initial_state(body)), base_url)
+
+
+def parse_api_page(body: bytes, base_url: str) -> Tuple[list, list]:
+    return extract_all(get_api_products(json.loads(body)), base_url)
+
+
+class ParsePool:
+    """Runs parse_* functions in worker processes so decoding never holds the fetching interpreter's GIL."""
+
+    def __init__(self, workers: int = PARSER_CONFIG['workers']):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn keeps workers from inheriting the API's threads, sockets and DB connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def parse(self, raw_page: RawPage, base_url: str) -> Tuple[list, list]:
+        if self.workers <= 0:
+            return raw_page.parser(raw_page.body, base_url)
+        return self._get_executor().submit(raw_page.parser, raw_page.body, base_url).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+_pool: Optional[ParsePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> ParsePool:
+    """Return the process-wide parse pool shared by all scrape jobs."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ParsePool()
+        return _pool
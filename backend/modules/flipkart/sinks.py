@@ -0,0 +1,135 @@
+"""
+Output sinks for scrapes that run without the database.
+
+A scraper given a sink hands it every parsed page of ProductRecords instead of
+writing them to MySQL. Sinks write Hive-style partitions, one directory per query
+and scrape day, so the output can be read as one dataset by DuckDB, Spark or pandas:
+
+    <output>/query=mobile-phones/date=2026-10-19/part-<run>.ndjson
+
+- NdjsonSink: one JSON object per product per line. The pre-encoded JSON columns of
+  the record are spliced in as they are, without being decoded again.
+- ParquetSink: buffers each partition and writes it as a Parquet file every
+  FLUSH_ROWS products and when the sink is closed. Needs pyarrow; the JSON columns
+  are stored as JSON text.
+
+A new sink format subclasses ProductSink and is registered in SINKS.
+"""
+
+import os
+import re
+import json
+import uuid
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List
+
+from backend.alchemy.records import ProductRecord
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for --format parquet
+    pyarrow = None
+
+# Record columns holding JSON text that is written as-is
+JSON_COLUMNS = frozenset(('rating', 'specifications', 'media', 'pricing'))
+
+
+def get_partition(query: str, scraped_at: datetime) -> str:
+    """Partition directory of a query's products scraped at `scraped_at`"""
+    slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-') or 'query'
+    return os.path.join('query=%s' % slug, 'date=%s' % scraped_at.strftime('%Y-%m-%d'))
+
+
+class ProductSink(ABC):
+    """Destination for scraped product pages; write() is called from several scraper threads."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.run_id = uuid.uuid4().hex[:12]  # keeps part files of concurrent or repeated runs apart
+        self.products = 0
+        self._lock = threading.Lock()
+
+    def write(self, query: str, page: int, records: List[ProductRecord]):
+        scraped_at = datetime.utcnow()
+        with self._lock:
+            self._write(get_partition(query, scraped_at), query, page, scraped_at.isoformat(timespec='seconds'), records)
+            self.products += len(records)
+
+    @abstractmethod
+    def _write(self, partition: str, query: str, page: int, scraped_at: str, records: List[ProductRecord]):
+        """Write one page of records to `partition`; called under the sink's lock"""
+
+    def get_path(self, partition: str, extension: str, part: str = '') -> str:
+        directory = os.path.join(self.directory, partition)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, 'part-%s%s.%s' % (self.run_id, part, extension))
+
+    def close(self):
+        pass
+
+
+class NdjsonSink(ProductSink):
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self._files: Dict[str, object] = {}
+
+    def _write(self, partition, query, page, scraped_at, records):
+        f = self._files.get(partition)
+        if f is None:
+            f = self._files[partition] = open(self.get_path(partition, 'ndjson'), 'a', encoding='utf-8')
+        context = ',%s:%s,%s:%s,%s:%s}\n' % (
+            json.dumps('query'), json.dumps(query), json.dumps('page'), page, json.dumps('scraped_at'), json.dumps(scraped_at)
+        )
+        f.write(''.join(
+            '{' + ','.join(
+                json.dumps(column) + ':' + (value if column in JSON_COLUMNS and value is not None else json.dumps(value))
+                for column, value in record.to_row().items()
+            ) + context
+            for record in records
+        ))
+        f.flush()
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+
+class ParquetSink(ProductSink):
+    FLUSH_ROWS: int = 50000
+
+    def __init__(self, directory: str):
+        if pyarrow is None:
+            raise RuntimeError('Parquet output needs pyarrow: pip install pyarrow')
+        super().__init__(directory)
+        self._rows: Dict[str, list] = {}
+        self._parts: Dict[str, int] = {}
+
+    def _write(self, partition, query, page, scraped_at, records):
+        rows = self._rows.setdefault(partition, [])
+        rows.extend(dict(record.to_row(), query=query, page=page, scraped_at=scraped_at) for record in records)
+        if len(rows) >= self.FLUSH_ROWS:
+            self._flush(partition)
+
+    def _flush(self, partition: str):
+        rows = self._rows.pop(partition, None)
+        if not rows:
+            return
+        part = self._parts[partition] = self._parts.get(partition, 0) + 1
+        path = self.get_path(partition, 'parquet', '-%05d' % part)
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), path)
+
+    def close(self):
+        with self._lock:
+            for partition in list(self._rows):
+                self._flush(partition)
+
+
+SINKS = {
+    'ndjson': NdjsonSink,
+    'parquet': ParquetSink,
+}
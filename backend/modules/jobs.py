@@ -0,0 +1,189 @@
+"""
+Scrape job manager.
+
+Runs up to JOBS_CONFIG['max_concurrent'] scrape jobs at once in this worker and
+queues the rest. It tracks each job's status by job id and cancels jobs on request.
+A scraper's `cancelled` event is checked by every sleep and retry wait in the
+scrape loop, so a cancelled job returns its slot within milliseconds. A request
+already in flight is abandoned to its fetch thread and its result discarded.
+"""
+
+import time
+import functools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from backend.settings.config import JOBS_CONFIG
+from backend.utils.logger import get_logger
+
+
+class JobCancelled(Exception):
+    """Raised out of a wait that was cut short because the job was cancelled"""
+
+
+class JobAlreadyActive(Exception):
+    """Raised by JobManager.submit for a job id that is still queued or running in this worker"""
+
+
+def cancellable_retry(tries: int = 3, delay: float = 2):
+    """Like retry.retry for scraper methods, but waits on the scraper's cancel event and gives up once it is set"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            for attempt in range(1, tries + 1):
+                if self.is_cancelled:
+                    raise JobCancelled('Job cancelled')
+                try:
+                    return method(self, *args, **kwargs)
+                except Exception:
+                    if attempt == tries:
+                        raise
+                if self.cancelled.wait(delay):
+                    raise JobCancelled('Job cancelled')
+        return wrapper
+    return decorator
+
+
+class JobState:
+    """What the manager knows about one job run in this worker"""
+
+    def __init__(self, job_id: str, query: str, engine: str, max_pages: int):
+        self.job_id = job_id
+        self.query = query
+        self.engine = engine
+        self.max_pages = max_pages
+        self.status = 'queued'  # queued, running, completed, cancelled, error
+        self.scraper = None
+        self.future: Optional[Future] = None
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.job_id,
+            'query': self.query,
+            'engine': self.engine,
+            'max_pages': self.max_pages,
+            'status': self.status,
+            'page': self.scraper.PAGE if self.scraper is not None else None,
+            'stats': dict(self.scraper.stats) if self.scraper is not None else None,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    MODULE: str = 'JOB_MANAGER'
+
+    def __init__(
+        self,
+        max_concurrent: int = JOBS_CONFIG['max_concurrent'],
+        history_size: int = JOBS_CONFIG['history_size'],
+    ):
+        self.logger = get_logger(self.MODULE)
+        self.max_concurrent = max(1, max_concurrent)
+        self.history_size = history_size
+        self._jobs: Dict[str, JobState] = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='scrape-job')
+
+    def submit(self, job_id: str, build: Callable[[], tuple], query: str, engine: str, max_pages: int) -> JobState:
+        """Queue a job; `build()` runs in the job thread and returns (scraper, query)"""
+        state = JobState(job_id, query, engine, max_pages)
+        with self._lock:
+            current = self._jobs.get(job_id)
+            if current is not None and current.finished_at is None:
+                raise JobAlreadyActive('Job %s is already %s' % (job_id, current.status))
+            self._jobs[job_id] = state
+            self._prune()
+            state.future = self._executor.submit(self._execute, state, build)
+        return state
+
+    def _execute(self, state: JobState, build: Callable[[], tuple]):
+        if state.cancel_requested:
+            self._finish(state, 'cancelled')
+            return
+        try:
+            scraper, query = build()
+        except Exception as e:
+            self.logger.error('Failed to start job %s: %s' % (state.job_id, str(e)))
+            self._finish(state, 'error')
+            return
+        with self.track(state.job_id, scraper, state=state):
+            scraper.run(query)
+
+    @contextmanager
+    def track(self, job_id: str, scraper, query: str = None, engine: str = None, state: Optional[JobState] = None):
+        """Register a scraper running in this worker so it can be listed and cancelled."""
+        if state is None:
+            state = JobState(job_id, query, engine, scraper.MAX_PAGES)
+        with self._lock:
+            self._jobs[job_id] = state
+            state.scraper = scraper
+            state.status = 'running'
+            state.started_at = time.time()
+            if state.cancel_requested:
+                scraper.is_cancelled = True
+        try:
+            yield state
+        finally:
+            self._finish(state, getattr(scraper, 'status', None) or ('cancelled' if scraper.is_cancelled else 'completed'))
+            with self._lock:
+                self._prune()
+
+    def _finish(self, state: JobState, status: str):
+        state.status = status
+        state.finished_at = time.time()
+
+    def _prune(self):
+        # Keep every unfinished job plus the most recent finished ones
+        finished = [job_id for job_id, state in self._jobs.items() if state.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job in this worker; False if it is not here or already finished"""
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None or state.finished_at is not None:
+                return False
+            state.cancel_requested = True
+            if state.scraper is not None:
+                state.scraper.is_cancelled = True
+            elif state.future is not None and state.future.cancel():
+                self._finish(state, 'cancelled')
+        self.logger.info('Cancellation requested for job %s' % job_id)
+        return True
+
+    def cancel_all(self) -> int:
+        with self._lock:
+            job_ids = [job_id for job_id, state in self._jobs.items() if state.finished_at is None]
+        return sum(1 for job_id in job_ids if self.cancel(job_id))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._jobs.get(job_id)
+            return state.to_dict() if state is not None else None
+
+    def list(self) -> list:
+        with self._lock:
+            return [state.to_dict() for state in reversed(self._jobs.values())]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return this worker's job manager, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,216 @@
+"""
+Recurring scrape scheduler.
+
+Schedules live in scrape_schedules and fire from a cron expression or a fixed
+interval, plus random jitter so many schedules created together do not all hit
+Flipkart at the same moment. Every API worker may run a Scheduler: a run is only
+launched by the worker whose conditional UPDATE advanced next_run_at.
+
+If the previous run of a schedule is still going, the new run is skipped
+(overlap_policy='skip') or coalesced into one extra run that starts as soon as
+the current one ends (overlap_policy='merge'). Every firing is recorded in
+schedule_runs.
+"""
+
+import time
+import uuid
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from backend.utils.cron import CronExpression
+from backend.utils.logger import get_logger
+from backend.settings.config import SCHEDULER_CONFIG
+from backend.alchemy.database import MysqlConnection
+from backend.modules.jobs import get_job_manager
+
+OVERLAP_POLICIES: tuple = ('skip', 'merge')
+
+
+def get_next_run(cron: Optional[str], interval_seconds: Optional[int], jitter_seconds: Optional[int],
+                 now: datetime) -> datetime:
+    """Next firing time after `now`, jittered by up to `jitter_seconds` (None means the default)"""
+    if cron:
+        next_run = CronExpression(cron).next_after(now)
+    else:
+        next_run = now + timedelta(seconds=interval_seconds)
+    if jitter_seconds is None:
+        jitter_seconds = SCHEDULER_CONFIG['default_jitter_seconds']
+    return next_run + timedelta(seconds=random.uniform(0, jitter_seconds))
+
+
+class Scheduler:
+    MODULE: str = 'SCHEDULER'
+
+    def __init__(
+        self,
+        poll_seconds: int = SCHEDULER_CONFIG['poll_seconds'],
+        batch_size: int = SCHEDULER_CONFIG['batch_size'],
+        max_concurrent_runs: int = SCHEDULER_CONFIG['max_concurrent_runs'],
+        stale_job_seconds: int = SCHEDULER_CONFIG['stale_job_seconds'],
+    ):
+        self.logger = get_logger(self.MODULE)
+        self.mysql = MysqlConnection()
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.max_concurrent_runs = max(1, max_concurrent_runs)
+        self.stale_job_seconds = stale_job_seconds
+
+        self._active = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self):
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        """Stop polling; runs already launched finish in the background."""
+        self._stopped.set()
+
+    def _run(self):
+        self.logger.info('Scheduler started, polling every %s seconds' % self.poll_seconds)
+        while not self._stopped.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                self.mysql.session.rollback()
+                self.logger.error('Scheduler tick failed: %s' % str(e))
+            self._stopped.wait(self.poll_seconds)
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """Fire every due schedule there is capacity for; returns the number of runs launched"""
+        now = now or datetime.utcnow()
+        launched = 0
+        for schedule in self.mysql.get_due_schedules(now, self.batch_size):
+            launched += self.fire(schedule, now)
+        return launched
+
+    def free_slots(self) -> int:
+        with self._lock:
+            return self.max_concurrent_runs - self._active
+
+    def fire(self, schedule, now: datetime) -> int:
+        values = {
+            'id': schedule.id,
+            'name': schedule.name,
+            'query': schedule.query,
+            'max_pages': schedule.max_pages,
+            'engine': schedule.engine,
+            'refresh': bool(schedule.refresh),
+            'overlap_policy': schedule.overlap_policy,
+            'running_job_id': schedule.running_job_id,
+        }
+        scheduled_for = schedule.next_run_at
+        stale_before = now - timedelta(seconds=self.stale_job_seconds)
+        overlapping = bool(values['running_job_id']) and self.mysql.is_job_running(values['running_job_id'], stale_before)
+        if not overlapping and self.free_slots() <= 0:
+            return 0  # stays due and is picked up first once a run slot frees up
+
+        next_run = get_next_run(schedule.cron, schedule.interval_seconds, schedule.jitter_seconds, now)
+        if not self.mysql.claim_schedule(values['id'], scheduled_for, next_run):
+            return 0  # another worker fired this run
+
+        if overlapping:
+            if values['overlap_policy'] == 'merge':
+                self.mysql.update_schedule(values['id'], {'pending_run': 1})
+                status = 'merged'
+            else:
+                status = 'skipped'
+            self.mysql.start_schedule_run({
+                'schedule_id': values['id'],
+                'job_id': values['running_job_id'],
+                'status': status,
+                'scheduled_for': scheduled_for,
+                'started_at': now,
+                'finished_at': now,
+                'duration_seconds': 0,
+            })
+            self.logger.info('Schedule "%s" %s: job %s still running' % (values['name'], status, values['running_job_id']))
+            return 0
+
+        self.launch(values, scheduled_for, now)
+        return 1
+
+    def launch(self, schedule: dict, scheduled_for: Optional[datetime], now: Optional[datetime] = None) -> str:
+        """Start a run of a schedule through the job manager and return its job id"""
+        now = now or datetime.utcnow()
+        job_id = uuid.uuid4().hex
+        run_id = self.mysql.start_schedule_run({
+            'schedule_id': schedule['id'],
+            'job_id': job_id,
+            'status': 'running',
+            'scheduled_for': scheduled_for,
+            'started_at': now,
+        })
+        self.mysql.update_schedule(schedule['id'], {'running_job_id': job_id, 'last_run_at': now})
+        with self._lock:
+            self._active += 1
+        self.logger.info('Schedule "%s" launching job %s' % (schedule['name'], job_id))
+
+        def build():
+            # Imported by the job thread so the scheduler does not pull in the scraper stack until a run fires
+            from backend.modules.flipkart.auto import create_job
+            return create_job(schedule['query'], schedule['max_pages'], schedule['engine'], schedule['refresh'], job_id), schedule['query']
+
+        # Run by the job manager so scheduled runs share its concurrency limit, show up in /scraper/jobs and can be stopped
+        started = time.time()
+        try:
+            state = get_job_manager().submit(job_id, build, schedule['query'], schedule['engine'], schedule['max_pages'])
+        except Exception as e:
+            self.logger.error('Scheduled job %s failed to start: %s' % (job_id, str(e)))
+            self._finish(schedule['id'], job_id, run_id, 'error', 0)
+            return job_id
+        state.future.add_done_callback(lambda future: self._done(state, schedule['id'], run_id, started))
+        return job_id
+
+    def _done(self, state, schedule_id: int, run_id: int, started: float):
+        # Runs in the job thread once the manager is done with the job, or at once if it was cancelled while queued
+        status = state.status
+        if state.future.cancelled() or state.finished_at is None:
+            status = 'cancelled' if state.cancel_requested else 'error'
+        elif state.future.exception() is not None:
+            self.logger.error('Scheduled job %s failed: %s' % (state.job_id, str(state.future.exception())))
+            status = 'error'
+        if state.scraper is not None:
+            state.scraper.mysql.close_all()
+        self._finish(schedule_id, state.job_id, run_id, status, time.time() - started)
+
+    def _finish(self, schedule_id: int, job_id: str, run_id: int, status: str, duration: float):
+        # The scoped session gives this run thread its own session on the shared engine
+        mysql = self.mysql
+        try:
+            now = datetime.utcnow()
+            mysql.finish_schedule_run(run_id, status, now, duration)
+            schedule = mysql.get_schedule(schedule_id)
+            if schedule is not None and schedule.running_job_id == job_id:
+                values = {'running_job_id': None}
+                if schedule.pending_run:
+                    # A merged run was owed while this one was going: fire it on the next tick
+                    values.update(pending_run=0, next_run_at=now)
+                mysql.update_schedule(schedule_id, values)
+        except Exception as e:
+            self.logger.error('Failed to record run %s of schedule %s: %s' % (run_id, schedule_id, str(e)))
+        finally:
+            mysql.close_all()
+            with self._lock:
+                self._active -= 1
+
+
+_scheduler: Optional[Scheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> Scheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
@@ -1,9 +1,36 @@
+"""
+Application logging.
+
+Every logger returned by get_logger is a child of "LOGGER" named after its module,
+so concurrent scrapers keep their own labels. Records go through a QueueHandler and
+are written by a single listener thread, so callers never block on console I/O.
+Set LOG_FORMAT=json for one JSON object per line, including the job_id and stage
+fields passed through `extra`.
+
+LogSampler rate-limits high-volume per-product messages and keeps counters so a
+summary can be logged instead.
+"""
+
+import json
+import time
+import queue
+import atexit
 import logging
+import threading
+from collections import Counter
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
 from colorama import Fore, Style, init
 
+from backend.settings.config import LOGGING_CONFIG
+
 # Initialize colorama
 init(autoreset=True)
 
+ROOT_LOGGER: str = "LOGGER"
+STRUCTURED_FIELDS: tuple = ('job_id', 'stage')
+
 class CustomFormatter(logging.Formatter):
     """Custom formatter for adding colors to logs."""
     COLORS = {
@@ -19,44 +46,104 @@ class CustomFormatter(logging.Formatter):
         log_message = super().format(record)
         return f"{log_color}{log_message}{Style.RESET_ALL}"
 
-class ModuleLogger(logging.Logger):
-    """Custom logger that supports module names."""
-    
-    def __init__(self, name, module_name=None):
-        super().__init__(name)
-        self.module_name = module_name or name
-    
-    def _log(self, level, msg, args, exc_info=None, extra=None, stack_info=False):
-        if extra is None:
-            extra = {}
-        extra['module_name'] = self.module_name
-        super()._log(level, msg, args, exc_info, extra, stack_info)
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the structured fields when present."""
 
-def get_logger(module_name=None):
-    """Create and return a logger with colored output and file saving."""
-    logger_name = "LOGGER"
-    
-    # Register our custom logger class
-    logging.setLoggerClass(ModuleLogger)
-    
-    logger = logging.getLogger(logger_name)
-    logger.setLevel(logging.DEBUG)
-    
-    # Set the module name if provided
-    if module_name and hasattr(logger, 'module_name'):
-        logger.module_name = module_name
-
-    # Check if handlers already exist to prevent duplicates
-    if not logger.handlers:
-        # Console handler with colors
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'module': record.module_name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class ModuleNameFilter(logging.Filter):
+    """Label each record with the module its logger was created for."""
+
+    def filter(self, record):
+        if not hasattr(record, 'module_name'):
+            record.module_name = record.name.rpartition('.')[2]
+        return True
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+def setup_logging():
+    """Attach the queue handler to the root app logger and start the listener thread once."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        if LOGGING_CONFIG['format'] == 'json':
+            formatter = JsonFormatter()
+        else:
+            formatter = CustomFormatter("%(asctime)s - %(module_name)s - %(levelname)s - %(message)s")
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        console_formatter = CustomFormatter(
-            "%(asctime)s - %(module_name)s - %(levelname)s - %(message)s"
-        )
-        console_handler.setFormatter(console_formatter)
+        console_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(ModuleNameFilter())
+
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.setLevel(LOGGING_CONFIG['level'])
+        logger.propagate = False
+        logger.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, console_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+def get_logger(module_name=None):
+    """Return the logger for a module, writing through the shared queue listener."""
+    setup_logging()
+    if not module_name:
+        return logging.getLogger(ROOT_LOGGER)
+    return logging.getLogger(f"{ROOT_LOGGER}.{module_name}")
+
+class LogSampler:
+    """Allow at most `per_second` messages of each kind per second and count all of them.
+
+    Counters accumulate until `summary()` is called, which returns and resets them.
+    """
+
+    def __init__(self, per_second: int = LOGGING_CONFIG['product_messages_per_second']):
+        self.per_second = per_second
+        self.counts = Counter()
+        self.suppressed = Counter()
+        self._windows = {}
+        self._lock = threading.Lock()
 
-        # Add handlers to the logger
-        logger.addHandler(console_handler)
+    def allow(self, kind: str) -> bool:
+        now = int(time.monotonic())
+        with self._lock:
+            self.counts[kind] += 1
+            second, emitted = self._windows.get(kind, (now, 0))
+            if second != now:
+                second, emitted = now, 0
+            if emitted >= self.per_second:
+                self.suppressed[kind] += 1
+                return False
+            self._windows[kind] = (second, emitted + 1)
+            return True
 
-    return logger
\ No newline at end of file
+    def summary(self) -> Optional[str]:
+        """'kind: count (n not shown), ...' for the messages seen since the last summary"""
+        with self._lock:
+            if not self.counts:
+                return None
+            parts = []
+            for kind, count in self.counts.items():
+                hidden = self.suppressed[kind]
+                parts.append(f"{kind}: {count}" + (f" ({hidden} not shown)" if hidden else ""))
+            self.counts.clear()
+            self.suppressed.clear()
+            return ', '.join(parts)
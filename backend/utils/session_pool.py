@@ -0,0 +1,219 @@
+"""
+A persistent pool of cookie/header sessions for the Flipkart API.
+
+Sessions are harvested with CookiesHeadersGetter (headless Chrome) by a background
+worker, persisted to disk with an expiry and handed out to scrapers round-robin.
+A session is refreshed shortly before it expires, or as soon as a scraper reports
+that the API rejected it, so Selenium never runs on the request path.
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from typing import Callable, List, Optional
+
+from backend.utils.logger import get_logger
+from backend.settings.config import SESSION_POOL_CONFIG
+from backend.utils.cookies_getter import CookiesHeadersGetter
+
+
+class PooledSession:
+    """A harvested set of cookies and headers with an expiry timestamp."""
+
+    def __init__(self, cookies: dict, headers: dict, created_at: float, expires_at: float,
+                 id: Optional[str] = None):
+        self.id = id or uuid.uuid4().hex
+        self.cookies = cookies
+        self.headers = headers
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+    def is_valid(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def needs_refresh(self, now: float, margin: float) -> bool:
+        return now >= self.expires_at - margin
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'cookies': self.cookies,
+            'headers': self.headers,
+            'created_at': self.created_at,
+            'expires_at': self.expires_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'PooledSession':
+        return cls(
+            cookies=data['cookies'],
+            headers=data['headers'],
+            created_at=data['created_at'],
+            expires_at=data['expires_at'],
+            id=data.get('id'),
+        )
+
+
+class SessionPool:
+    MODULE: str = 'SESSION_POOL'
+    RETRY_DELAY_SECONDS: int = 30
+
+    def __init__(
+        self,
+        path: str = SESSION_POOL_CONFIG['path'],
+        size: int = SESSION_POOL_CONFIG['size'],
+        ttl_seconds: int = SESSION_POOL_CONFIG['ttl_seconds'],
+        refresh_margin_seconds: int = SESSION_POOL_CONFIG['refresh_margin_seconds'],
+        acquire_timeout_seconds: int = SESSION_POOL_CONFIG['acquire_timeout_seconds'],
+        getter_factory: Callable[[], CookiesHeadersGetter] = CookiesHeadersGetter,
+    ):
+        self.logger = get_logger(self.MODULE)
+        self.path = path
+        self.size = max(1, size)
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.getter_factory = getter_factory
+
+        self._sessions: List[PooledSession] = []
+        self._cursor = 0
+        self._condition = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._load()
+
+    def start(self):
+        """Start the background refresh worker if it is not running yet."""
+        with self._condition:
+            if self._worker and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name='session-pool-refresh', daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledSession:
+        """Return the next valid session round-robin, waiting for the worker if the pool is empty."""
+        self.start()
+        timeout = self.acquire_timeout_seconds if timeout is None else timeout
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                now = time.time()
+                valid = [session for session in self._sessions if session.is_valid(now)]
+                if valid:
+                    session = valid[self._cursor % len(valid)]
+                    self._cursor += 1
+                    return session
+
+                self._wakeup.set()
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise TimeoutError('No valid session available after %s seconds' % timeout)
+                self._condition.wait(remaining)
+
+    def report_failure(self, session: PooledSession):
+        """Invalidate a session the API rejected and schedule its replacement."""
+        with self._condition:
+            for pooled in self._sessions:
+                if pooled.id == session.id and pooled.expires_at > 0:
+                    pooled.expires_at = 0
+                    self.logger.warning('Session %s rejected by API, scheduling refresh' % session.id[:8])
+                    self._save()
+                    break
+        self._wakeup.set()
+
+    def _run(self):
+        self.logger.info('Session pool refresh worker started')
+        while not self._stopped.is_set():
+            self._wakeup.clear()
+            try:
+                self._refresh()
+            except Exception as e:
+                self.logger.error('Session refresh failed: %s' % str(e))
+                self._stopped.wait(self.RETRY_DELAY_SECONDS)
+                continue
+            self._wakeup.wait(self._seconds_until_next_refresh())
+
+    def _refresh(self):
+        now = time.time()
+        with self._condition:
+            self._sessions = [session for session in self._sessions if session.is_valid(now)]
+            stale = [
+                session for session in self._sessions
+                if session.needs_refresh(now, self.refresh_margin_seconds)
+            ]
+            missing = self.size - len(self._sessions)
+
+        # Harvesting runs outside the lock so scrapers keep using the old sessions meanwhile
+        for session in stale:
+            self._replace(session, self._harvest())
+        for _ in range(missing):
+            self._replace(None, self._harvest())
+
+    def _replace(self, old: Optional[PooledSession], new: PooledSession):
+        with self._condition:
+            if old is not None and old in self._sessions:
+                self._sessions[self._sessions.index(old)] = new
+            else:
+                self._sessions.append(new)
+            self._save()
+            self._condition.notify_all()
+
+    def _harvest(self) -> PooledSession:
+        getter = self.getter_factory()
+        cookies = getter.get_cookies()
+        headers = getter.get_headers()
+        now = time.time()
+        self.logger.info('Harvested new session, valid for %s seconds' % self.ttl_seconds)
+        return PooledSession(cookies, headers, created_at=now, expires_at=now + self.ttl_seconds)
+
+    def _seconds_until_next_refresh(self) -> float:
+        with self._condition:
+            if len(self._sessions) < self.size:
+                return 0
+            next_refresh = min(session.expires_at for session in self._sessions) - self.refresh_margin_seconds
+        return max(0.0, next_refresh - time.time())
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            now = time.time()
+            self._sessions = [
+                session for session in map(PooledSession.from_dict, data.get('sessions', []))
+                if session.is_valid(now)
+            ]
+            self.logger.info('Loaded %s persisted sessions' % len(self._sessions))
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning('Ignoring unreadable session file %s: %s' % (self.path, str(e)))
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = '%s.tmp' % self.path
+        with open(tmp_path, 'w') as f:
+            json.dump({'sessions': [session.to_dict() for session in self._sessions]}, f)
+        os.replace(tmp_path, self.path)
+
+
+_pool: Optional[SessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """Return the process-wide session pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool()
+        return _pool
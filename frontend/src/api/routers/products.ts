@@ -98,6 +98,8 @@ export interface Product {
   id: number;
   product_id: string;
   title: string;
+  brand?: string | null;
+  model?: string | null;
   url: string;
   rating: Rating;
   specifications: string[];
@@ -125,6 +127,31 @@ export interface PaginatedResponse<T> {
   total_pages: number;
 }
 
+export interface PriceFacet {
+  min: number;
+  max: number | null;
+  count: number;
+}
+
+export interface ProductFacets {
+  total: number;
+  categories: Record<string, number>;
+  availability: Record<string, number>;
+  price: PriceFacet[];
+  rating: Record<string, number>;
+  brands: Record<string, number>;
+}
+
+export interface FacetFilters {
+  q?: string;
+  category?: string;
+  brand?: string;
+  availability?: string;
+  min_price?: number;
+  max_price?: number;
+  min_rating?: number;
+}
+
 // Products API functions
 export const productsApi = {
   // Get all products with caching and pagination
@@ -160,6 +187,22 @@ export const productsApi = {
     }
   },
 
+  // Get many products in one request; items follow the request order, null for unknown ids
+  getProductsBatch: async (
+    keys: { ids?: number[]; product_ids?: string[] },
+    fields?: (keyof Product)[]
+  ): Promise<{ items: (Product | null)[]; missing: (number | string)[] }> => {
+    try {
+      const response = await api.post<{ items: (Product | null)[]; missing: (number | string)[] }>(
+        '/products/batch',
+        { ...keys, fields }
+      );
+      return response.data;
+    } catch (error) {
+      throw new Error('Failed to fetch products');
+    }
+  },
+
   // Fetch all options globally across items
   fetchGlobalFilterOptions: async () => {
     // We use a reasonably high limit to capture variation. Cached automatically.
@@ -575,6 +618,29 @@ export const productsApi = {
     }
   },
 
+  // Get filter sidebar counts for the current search/browse filters
+  getFacets: async (filters: FacetFilters = {}): Promise<ProductFacets> => {
+    const params = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        params.append(key, String(value));
+      }
+    });
+    const cacheKey = `facets_${params.toString()}`;
+    const cached = productCache.get<ProductFacets>(cacheKey);
+    if (cached) {
+      return cached;
+    }
+
+    try {
+      const response = await api.get<ProductFacets>(`/products/facets?${params.toString()}`);
+      productCache.set(cacheKey, response.data, 60 * 1000);
+      return response.data;
+    } catch (error) {
+      throw new Error('Failed to fetch product facets');
+    }
+  },
+
   // Clear cache manually
   clearCache: (): void => {
     productCache.clear();
@@ -3,16 +3,58 @@ import api from "..";
 export interface ScraperResponse {
     message: string;
     status: string;
+    job_id?: string;
 }
 
+export interface ScraperCheckpoint {
+    job_id: string;
+    query: string;
+    engine: string;
+    max_pages: number;
+    last_page: number;
+    status: string;
+    stats: Record<string, number>;
+    updated_at: string;
+}
+
+export interface ScraperJob {
+    job_id: string;
+    query: string;
+    engine: string;
+    max_pages: number;
+    status: 'queued' | 'running' | 'completed' | 'cancelled' | 'error';
+    page: number | null;
+    stats: Record<string, number> | null;
+}
+
+export type ScraperEngine = 'html' | 'api' | 'auto';
+
 export const scraperApi = {
-    startScraper: async (query: string, maxPages: number): Promise<ScraperResponse> => {
+    startScraper: async (query: string, maxPages: number, engine: ScraperEngine = 'html', refresh: boolean = false): Promise<ScraperResponse> => {
         const response = await api.post<ScraperResponse>('/scraper/start', {
             query: query,
             max_pages: maxPages,
+            engine: engine,
+            refresh: refresh,
         });
         return response.data;
     },
+    resumeScraper: async (jobId: string): Promise<ScraperResponse> => {
+        const response = await api.post<ScraperResponse>(`/scraper/resume/${jobId}`);
+        return response.data;
+    },
+    getCheckpoints: async (): Promise<ScraperCheckpoint[]> => {
+        const response = await api.get<ScraperCheckpoint[]>('/scraper/checkpoints');
+        return response.data;
+    },
+    getJobs: async (): Promise<ScraperJob[]> => {
+        const response = await api.get<ScraperJob[]>('/scraper/jobs');
+        return response.data;
+    },
+    stopJob: async (jobId: string): Promise<ScraperResponse> => {
+        const response = await api.post<ScraperResponse>(`/scraper/jobs/${jobId}/stop`);
+        return response.data;
+    },
     stopScraper: async (): Promise<ScraperResponse> => {
         const response = await api.post<ScraperResponse>('/scraper/stop');
         return response.data;
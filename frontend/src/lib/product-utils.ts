@@ -35,10 +35,10 @@ export interface FrontendProduct {
 
 // Transform API product to frontend product format
 export const transformApiProduct = (apiProduct: ApiProduct): FrontendProduct => {
-  // Extract brand and model from title
+  // Brand and model are extracted at ingest; older rows fall back to splitting the title
   const titleParts = apiProduct.title.split(' ');
-  const brand = titleParts[0] || 'Unknown';
-  const model = titleParts.slice(1).join(' ') || 'Unknown Model';
+  const brand = apiProduct.brand || titleParts[0] || 'Unknown';
+  const model = apiProduct.model || titleParts.slice(1).join(' ') || 'Unknown Model';
 
   // Get current price (non-struck price)
   const currentPrice = apiProduct.pricing.prices.find(p => !p.strikeOff)?.value || 0;
@@ -0,0 +1,28 @@
+"""
+Query-plan regression tests: every check in backend.benchmarks.query_plans.CHECKS
+runs as its own test against a seeded scratch database.
+
+QUERY_PLAN_ROWS sets the catalog size (default 5000) and QUERY_PLAN_URL points the
+checks at another database, e.g. a local MySQL stand-in.
+"""
+
+import os
+
+import pytest
+
+from backend.benchmarks.query_plans import CHECKS, PlanRun
+
+
+@pytest.fixture(scope='module')
+def plan_run():
+    run = PlanRun(os.getenv('QUERY_PLAN_URL'), int(os.getenv('QUERY_PLAN_ROWS', '5000')))
+    yield run
+    run.close()
+
+
+@pytest.mark.parametrize('check', CHECKS, ids=[check.name for check in CHECKS])
+def test_query_plan(plan_run, check):
+    if plan_run.skips(check):
+        pytest.skip('only checked on %s' % ', '.join(check.dialects))
+    failures, notes, plans, queries = plan_run.run(check)
+    assert not failures, '%s (%s queries):\n%s' % (check.name, queries, '\n'.join(failures))